@@ -29,5 +29,6 @@ setuptools.setup(
     install_requires=[
         # 3rd party dependencies
         'arcade>=2.4.2',
+        'numpy',
     ],
 )
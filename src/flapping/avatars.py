@@ -0,0 +1,71 @@
+"""Player avatar textures: recolored from the avatar images, built once and shared by every Player that uses them"""
+import functools
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import PIL.Image
+import arcade
+import numpy as np
+
+from gnp.arcadelib.assets import AssetRegistry
+from flapping import flapping_cfg as CFG
+
+# colors of player_blob.png that are replaced by a player's color, and how bright the replacement is
+BLOB_PALETTE = {
+    (65, 216, 0, 255): 1.0,
+    (53, 178, 0, 255): 0.7,
+}
+
+# (image path, color) -> (right-facing texture, left-facing texture)
+textures = AssetRegistry()
+
+
+def _pack(rgba: Tuple[int, int, int, int]) -> int:
+    """An RGBA color as the uint32 that its 4 bytes make"""
+    return int(np.array(rgba, dtype=np.uint8).view(np.uint32)[0])
+
+
+def palette_swap(img: PIL.Image.Image, palette: Dict[Tuple[int, int, int, int], Tuple[int, int, int, int]]) \
+        -> PIL.Image.Image:
+    """A copy of the image with each RGBA color in the palette replaced by the color it maps to"""
+    pixels = np.array(img.convert('RGBA'))
+    packed = pixels.view(np.uint32)[..., 0]  # compare and replace whole pixels at a time
+    for src, dst in palette.items():
+        packed[packed == _pack(src)] = _pack(dst)
+    return PIL.Image.fromarray(pixels, 'RGBA')
+
+
+def _load(img_path: str, clr: Optional[arcade.arcade_types.Color]) -> Tuple[arcade.Texture, arcade.Texture]:
+    print(f'Loading texture: {img_path} {clr}')
+    img: PIL.Image.Image = PIL.Image.open(img_path)
+    if img_path.endswith('player_blob.png') and clr is not None:
+        r, g, b = clr[:3]
+        palette = {src: (int(r * brightness), int(g * brightness), int(b * brightness), 255)
+                   for src, brightness in BLOB_PALETTE.items()}
+        img = palette_swap(img, palette)
+    else:
+        img = img.convert('RGBA')
+    right_texture = arcade.Texture(f'{img_path}-{clr}-right', img)
+    left_texture = arcade.Texture(f'{img_path}-{clr}-left', img.transpose(PIL.Image.FLIP_LEFT_RIGHT))
+    for texture in (right_texture, left_texture):
+        _ = texture.hit_box_points  # computed on first use, which is slow enough to do ahead of time too
+    return right_texture, left_texture
+
+
+def get_textures(img_path: str, clr: Optional[arcade.arcade_types.Color]) -> Tuple[arcade.Texture, arcade.Texture]:
+    """The right- and left-facing textures of an avatar image, recolored with `clr` (unless it is None)"""
+    return textures.get((img_path, clr), functools.partial(_load, img_path, clr))
+
+
+def prewarm(avatars: Iterable[CFG.PlayerAvatar]) -> threading.Thread:
+    """Build the textures of the given avatars on a worker thread (ex: while the welcome screen is up)"""
+    keys = []
+    for avatar in avatars:
+        key = (img_path(avatar), avatar.color)
+        textures.register(key, functools.partial(_load, *key))
+        keys.append(key)
+    return textures.prewarm(keys)
+
+
+def img_path(avatar: CFG.PlayerAvatar) -> str:
+    return 'resources/img/' + avatar.image
@@ -0,0 +1,287 @@
+"""
+Microbenchmarks for the hot paths of gnp.arcadelib and the Flapping game. No window is opened.
+
+Results are printed to stdout as JSON: ops/sec and per-call latency percentiles for each benchmark. Run with:
+
+    python -m flapping.benchmark [--players N] [--output results.json] [--baseline old_results.json]
+
+With --baseline, each benchmark's median latency is compared to the one in the baseline file and the exit code
+is 1 if any got slower than --max-slowdown allows, so a CI job can fail on a regression.
+"""
+import argparse
+import contextlib
+import json
+import os
+import os.path
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import pyglet
+pyglet.options['shadow_window'] = False  # so a CI runner with no display can run this (see flapping.simulation)
+from gnp.arcadelib import scriptutl
+from gnp.arcadelib.actor import Actor, ActorList
+from gnp.arcadelib.inputqueue import InputQueue
+from gnp.arcadelib.particles import ParticlePool
+from gnp.arcadelib.profiler import FrameProfiler
+from gnp.arcadelib.timers import Timers
+from flapping import flapping_cfg as CFG
+from flapping import collision
+from flapping.simulation import Simulation
+
+
+class _IdleActor(Actor):
+    """Actor that does no work, so ActorList's own overhead is what gets measured"""
+    def __init__(self, reap: bool = False):
+        self.reap = reap
+
+    def update(self, delta_time: float):
+        pass
+
+    def draw(self):
+        pass
+
+    def can_reap(self) -> bool:
+        return self.reap
+
+    def kill(self):
+        pass
+
+
+def measure(name: str, func: Callable[[], None], samples: int, batch: int = 1,
+            setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Time `samples` runs of `batch` calls to func and summarize them.
+
+    Each sample is timed as a whole and divided by `batch`, so very cheap calls aren't swamped by the cost of
+    reading the clock. `setup` is called (untimed) before each sample."""
+    func()  # warm up
+    times: List[float] = []
+    total_ns = 0
+    for _ in range(samples):
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        for _ in range(batch):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        total_ns += elapsed
+        times.append(elapsed / batch)
+    times.sort()
+
+    def percentile(pct: float) -> float:
+        return round(times[min(int(len(times) * pct / 100), len(times) - 1)] / 1000, 3)
+
+    return {
+        'name': name,
+        'calls': samples * batch,
+        'ops_per_sec': round(samples * batch / (total_ns / 1e9), 1),
+        'p50_us': percentile(50),
+        'p95_us': percentile(95),
+        'p99_us': percentile(99),
+    }
+
+
+def make_sim(player_count: int, seed: int) -> Simulation:
+    """A Simulation on the first map, with players spread over cells that are clear of walls, spikes and each other"""
+    random.seed(seed)
+    sim = Simulation(1280, 720)
+    names = list(CFG.Registration.avatars)
+    for idx in range(player_count):
+        sim.add_player(names[idx % len(names)])
+    sim.setup(CFG.Game.maps[0])
+    sim.state = Simulation.PLAY
+
+    grid = sim.tile_grid
+    spots = [(col, row) for col in range(grid.cols) for row in range(grid.rows)]
+    random.shuffle(spots)
+    placed = 0
+    for col, row in spots:
+        if placed == player_count:
+            break
+        p = sim.player_list[placed]
+        p.center_x = col * grid.tile_width + grid.tile_width / 2
+        p.center_y = row * grid.tile_height + grid.tile_height / 2
+        p.last_position = p.position
+        walls, killers = grid.check_for_collision(p)
+        if walls or killers or any(collision.intersect_AABB(p, other) for other in sim.player_list[:placed]):
+            continue
+        placed += 1
+    return sim
+
+
+def run_benchmarks(player_count: int, scale: float = 1.0, seed: int = 1) -> List[Dict]:
+    """Run every benchmark. `scale` multiplies the number of samples taken."""
+    def samples(count: int) -> int:
+        return max(int(count * scale), 1)
+
+    results = []
+    delta_time = 1 / CFG.Game.tick_rate
+
+    # collision primitive
+    with contextlib.redirect_stdout(sys.stderr):
+        sim = make_sim(2, seed)
+    p1, p2 = sim.player_list[0], sim.player_list[1]
+    p2.position = (p1.center_x + 10, p1.center_y + 20)
+    results.append(measure('intersect_AABB', lambda: collision.intersect_AABB(p1, p2), samples(2000), batch=100))
+
+    # gnp.arcadelib containers, each holding many items that stay alive for the whole benchmark
+    timers = Timers()
+    for _ in range(1000):
+        timers.add(1e9, lambda: None)
+    results.append(measure('Timers.update[1000]', lambda: timers.update(delta_time), samples(2000)))
+
+    def add_due_timers() -> None:
+        for _ in range(100):
+            timers.add(0.0, lambda: None)
+    results.append(measure('Timers.update[1000, 100 due]', lambda: timers.update(delta_time), samples(500),
+                           setup=add_due_timers))
+
+    sched = scriptutl.Scheduler()
+    for _ in range(1000):
+        sched.add(scriptutl.wait_until(lambda: False))
+    results.append(measure('Scheduler.update[1000]', sched.update, samples(2000)))
+
+    sched = scriptutl.Scheduler()
+    for _ in range(1000):
+        sched.add(scriptutl.sleep(1e9))
+    results.append(measure('Scheduler.update[1000 sleeping]', sched.update, samples(2000)))
+
+    actors = ActorList(_IdleActor() for _ in range(1000))
+    results.append(measure('ActorList.update[1000]', lambda: actors.update(delta_time), samples(2000)))
+
+    def add_finished_actors() -> None:
+        actors.extend(_IdleActor(reap=True) for _ in range(10000))
+    results.append(measure('ActorList.update[1000, 10000 reaped]', lambda: actors.update(delta_time), samples(200),
+                           setup=add_finished_actors))
+
+    # profiler calls stay in the game loop, so they must cost next to nothing when it is off
+    for enabled in (False, True):
+        prof = FrameProfiler(enabled=enabled)
+        prof.start()
+        results.append(measure('FrameProfiler.lap[{}]'.format('on' if enabled else 'off'), lambda: prof.lap('phase'),
+                               samples(2000), batch=100))
+
+    # a frame's worth of gameplay input: queued as it arrives, then drained before the ticks
+    queue = InputQueue()
+    actions = {input_id: lambda: None for input_id in range(16)}
+
+    def push_drain() -> None:
+        for input_id in range(16):
+            queue.push(input_id)
+        for input_id, _, _, _ in queue.drain():
+            actions[input_id]()
+    results.append(measure('InputQueue.push+drain[16]', push_drain, samples(2000)))
+
+    pool = ParticlePool(4096, 20, (255, 255, 255))
+
+    def refill_pool() -> None:
+        pool.kill()
+        pool.burst(0.0, 0.0, 2000, 5.0, 10.0, 20.0)
+    results.append(measure('ParticlePool.update[2000]', lambda: pool.update(delta_time), samples(2000),
+                           setup=refill_pool))
+    results.append(measure('ParticlePool.burst[15]', lambda: pool.burst(0.0, 0.0, 15, 5.0, 0.1, 0.2), samples(2000),
+                           setup=pool.kill))
+
+    # players
+    with contextlib.redirect_stdout(sys.stderr):
+        sim = make_sim(player_count, seed)
+    players = list(sim.active_players)
+    start_state = [(p.position, p.change_x, p.change_y) for p in players]
+
+    def reset_players() -> None:
+        for p, (position, change_x, change_y) in zip(players, start_state):
+            p.position = position
+            p.last_position = position
+            p.change_x = change_x
+            p.change_y = change_y
+
+    def update_players() -> None:
+        for p in players:
+            p.update()
+
+    def wall_pass() -> None:
+        for p in players:
+            hit_wall_list, _ = sim.tile_grid.check_for_collision(p, p.last_position)
+            sim.check_wall_tiles_collision(p, hit_wall_list)
+
+    def kill_pass() -> None:
+        for p in players:
+            _, hit_killer_list = sim.tile_grid.check_for_collision(p)
+            sim.check_killer_tiles_collision(p, hit_killer_list)
+
+    tag = f'[{player_count} players]'
+    results.append(measure('Player.update' + tag, update_players, samples(1000), setup=reset_players))
+    results.append(measure('wall_collision' + tag, wall_pass, samples(1000), setup=reset_players))
+    results.append(measure('kill_collision' + tag, kill_pass, samples(1000), setup=reset_players))
+    results.append(measure('player_collision' + tag, lambda: sim.check_player_collision(players), samples(1000),
+                           setup=reset_players))
+
+    # a whole match tick: everything above plus scoring, deaths, FX and scripts
+    with contextlib.redirect_stdout(sys.stderr):
+        sim = make_sim(player_count, seed)
+        sim.auto_continue = True
+        script = sim.match_script(seed)
+        next(script)
+
+        def tick() -> None:
+            for p in sim.player_list:
+                roll = random.random()
+                if roll < 0.05:
+                    p.on_up()
+                elif roll < 0.07:
+                    p.on_left()
+                elif roll < 0.09:
+                    p.on_right()
+            sim.update(delta_time)
+            next(script)
+        results.append(measure('Simulation.update' + tag, tick, samples(2000)))
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], max_slowdown: float) -> List[str]:
+    """Return a description of each benchmark whose median latency regressed past max_slowdown"""
+    old = {r['name']: r for r in baseline}
+    regressions = []
+    for r in results:
+        if r['name'] in old and r['p50_us'] > old[r['name']]['p50_us'] * max_slowdown:
+            regressions.append('{}: p50 {:.2f}us -> {:.2f}us'.format(r['name'], old[r['name']]['p50_us'], r['p50_us']))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=8, help='number of players in the player benchmarks')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the number of samples taken')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to check for regressions against')
+    parser.add_argument('--max-slowdown', type=float, default=1.25, help='allowed ratio of p50 to the baseline p50')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # resources are loaded relative to the package
+
+    results = run_benchmarks(args.players, args.scale)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w') as out_file:
+            out_file.write(text + '\n')
+
+    if baseline:
+        with open(baseline) as in_file:
+            regressions = compare(results, json.load(in_file)['results'], args.max_slowdown)
+        for regression in regressions:
+            print('REGRESSION ' + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
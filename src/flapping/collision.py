@@ -1,10 +1,15 @@
 """Utilities for examining collisions between objects"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
 
 from flapping import util
 
 
 class Hit:
     """Describes the intersection between two objects"""
+    __slots__ = ('delta', 'normal', 'pos')
+
     def __init__(self, delta, normal, pos):
         # vector (2-tuple) representing overlap between the two objects, vector can be added to the colliding
         # object's position to move it back to a non-colliding state.
@@ -18,6 +23,38 @@ class Hit:
         return 'delta={} normal={} pos={}'.format(self.delta, self.normal, self.pos)
 
 
+class Rect:
+    """Axis-aligned rectangle that can stand in for a Sprite in intersect_AABB()"""
+    def __init__(self, left: float, bottom: float, width: float, height: float):
+        self.left = left
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+        self.right = left + width
+        self.top = bottom + height
+        self.center_x = left + width / 2
+        self.center_y = bottom + height / 2
+
+    def __str__(self):
+        return 'left={} bottom={} width={} height={}'.format(self.left, self.bottom, self.width, self.height)
+
+
+class SweepHit:
+    """Describes the first contact of a moving object with a static object"""
+    __slots__ = ('time', 'normal', 'pos')
+
+    def __init__(self, time, normal, pos):
+        # fraction (0.0-1.0) of the movement at which the objects first touch
+        self.time = time
+        # vector (2-tuple) representing surface normal at point of contact
+        self.normal = normal
+        # vector (2-tuple) representing the center of the moving object at the time of contact
+        self.pos = pos
+
+    def __str__(self):
+        return 'time={} normal={} pos={}'.format(self.time, self.normal, self.pos)
+
+
 def intersect_AABB(sprite1, sprite2):
     """Do intersection test between two Sprites"""
     # Reference: https://noonat.github.io/intersect/
@@ -55,3 +92,105 @@ def intersect_AABB(sprite1, sprite2):
             pos=(sprite2.center_x, sprite1.center_y + (sprite1.height/2 * sign_y))
         )
     return hit
+
+
+def sweep_AABB(sprite1, start, sprite2):
+    """Do swept intersection test of a moving Sprite against a static Sprite
+
+    `sprite1` moved in a straight line from the `start` position (2-tuple of its center) to where it is now.
+    Returns a SweepHit for the first time it touched `sprite2` during that move, or None if it never did. Sprites
+    that already overlap at `start` also return None, as intersect_AABB() is the right tool to separate them.
+    Unlike intersect_AABB(), this can't miss a collision when a Sprite moves further than the size of the objects
+    in a single step."""
+    # Reference: https://noonat.github.io/intersect/ (sweep the box against the other box expanded by its size)
+    move_x = sprite1.center_x - start[0]
+    move_y = sprite1.center_y - start[1]
+    half_x = sprite1.width/2 + sprite2.width/2
+    half_y = sprite1.height/2 + sprite2.height/2
+
+    if move_x == 0:
+        if abs(sprite2.center_x - start[0]) >= half_x:
+            return None
+        near_x, far_x = float('-inf'), float('inf')
+    else:
+        sign_x = util.sign(move_x)
+        near_x = (sprite2.center_x - sign_x * half_x - start[0]) / move_x
+        far_x = (sprite2.center_x + sign_x * half_x - start[0]) / move_x
+
+    if move_y == 0:
+        if abs(sprite2.center_y - start[1]) >= half_y:
+            return None
+        near_y, far_y = float('-inf'), float('inf')
+    else:
+        sign_y = util.sign(move_y)
+        near_y = (sprite2.center_y - sign_y * half_y - start[1]) / move_y
+        far_y = (sprite2.center_y + sign_y * half_y - start[1]) / move_y
+
+    near_time = max(near_x, near_y)
+    far_time = min(far_x, far_y)
+    if near_time >= far_time or near_time < 0 or near_time > 1:
+        return None
+
+    # Ties go to the Y direction, same as intersect_AABB()
+    if near_x > near_y:
+        normal = (util.sign(move_x) * -1, 0)
+    else:
+        normal = (0, util.sign(move_y) * -1)
+    return SweepHit(
+        time=near_time,
+        normal=normal,
+        pos=(start[0] + move_x * near_time, start[1] + move_y * near_time)
+    )
+
+
+def intersect_AABB_batch(centers1, half_sizes1, centers2, half_sizes2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Batched version of intersect_AABB() that works on arrays of boxes instead of Sprites.
+
+    Each argument is an array whose last axis is (x, y): box centers and half extents (half of width and height).
+    The arrays are broadcast against each other, so one box can be tested against many with shapes (2,) and (N, 2),
+    or many against many with shapes (M, 1, 2) and (1, N, 2).
+
+    Returns (hit, delta, normal) where `hit` is a boolean array of the broadcast shape (without the last axis) and
+    `delta` and `normal` are the same as Hit.delta and Hit.normal, with the last axis being (x, y). Entries that
+    don't intersect have a delta and normal of (0, 0). Collisions in the Y direction get the same priority as in
+    intersect_AABB()."""
+    delta = np.asarray(centers2, dtype=np.float64) - np.asarray(centers1, dtype=np.float64)
+    overlap = (np.asarray(half_sizes1, dtype=np.float64) + np.asarray(half_sizes2, dtype=np.float64)) - np.abs(delta)
+    overlap_x = overlap[..., 0]
+    overlap_y = overlap[..., 1]
+    hit = (overlap_x > 0) & (overlap_y > 0)
+
+    sign = np.where(delta < 0, -1.0, 1.0)
+    resolve_x = hit & (overlap_x + 1 < overlap_y)
+    resolve_y = hit & ~resolve_x
+
+    out_delta = np.zeros(overlap.shape)
+    out_normal = np.zeros(overlap.shape)
+    out_delta[..., 0] = np.where(resolve_x, -overlap_x * sign[..., 0], 0.0)
+    out_delta[..., 1] = np.where(resolve_y, -overlap_y * sign[..., 1], 0.0)
+    out_normal[..., 0] = np.where(resolve_x, -sign[..., 0], 0.0)
+    out_normal[..., 1] = np.where(resolve_y, -sign[..., 1], 0.0)
+    return hit, out_delta, out_normal
+
+
+def sweep_and_prune(sprites: Sequence) -> List[Tuple[int, int]]:
+    """Broadphase collision test between all given Sprites (treated as AABB).
+
+    Returns index pairs (i, j), with i < j, of the Sprites whose bounding boxes overlap or touch. Pairs are sorted
+    so they come out in the same order as a nested loop over the Sprites would visit them. Sprites are sorted by
+    their left edge and swept along the X axis, so only Sprites that are near each other are ever compared."""
+    boxes = sorted(
+        (s.center_x - s.width / 2, s.center_x + s.width / 2, s.center_y - s.height / 2, s.center_y + s.height / 2, idx)
+        for idx, s in enumerate(sprites)
+    )
+    pairs = []
+    active: List[Tuple[float, float, float, float, int]] = []  # boxes the sweep hasn't moved past yet
+    for box in boxes:
+        left, _, bottom, top, idx = box
+        active = [other for other in active if other[1] >= left]
+        for other in active:
+            if other[2] <= top and bottom <= other[3]:
+                pairs.append((other[4], idx) if other[4] < idx else (idx, other[4]))
+        active.append(box)
+    pairs.sort()
+    return pairs
@@ -8,11 +8,31 @@ of event this is. The value returned is suitable to serve as the key in a dictio
 This mapping often looks something like this
 
     event_mapping[event.get_id()] = player.move_up  # where player.move_up is a method reference
+
+Gameplay input skips the Event objects: it is queued as a compact integer id (see input_id()), which an Event
+gives with `.get_input_id()`, so the same mapping can be keyed by those ids instead.
 """
-from typing import Tuple, Optional
+from typing import Sequence, Tuple, Optional
 
 import arcade
 
+# Kinds of input, the lowest 3 bits of an input id
+KEY_PRESS, KEY_RELEASE, JOY_BUTTON_PRESS, JOY_BUTTON_RELEASE, JOY_HAT_MOTION = range(5)
+PRESS_KINDS = (KEY_PRESS, JOY_BUTTON_PRESS)
+
+
+def input_id(kind: int, device: int, code: int = 0) -> int:
+    """Integer that identifies an input, like Event.get_id() but cheap to build and to hash.
+
+    device: 0 for the keyboard, or 1 + the joystick's index in Game.joysticks (at most 255)
+    code: the key or button (0 for hat motion)"""
+    return kind | device << 3 | code << 11
+
+
+def input_kind(value: int) -> int:
+    """The kind of input (ex: KEY_PRESS) that an input_id() value identifies"""
+    return value & 7
+
 
 class Event:
     """Base abstract class that represents an input event, regardless of device"""
@@ -20,6 +40,10 @@ class Event:
         """Return a value that identifies the type of event (usually a tuple)"""
         pass
 
+    def get_input_id(self, joysticks: Sequence[arcade.joysticks.pyglet.input.base.Joystick]) -> int:
+        """Return the input_id() of this type of event. `joysticks` is the list the device index is taken from."""
+        raise NotImplementedError("Must implement")
+
 
 class KeyPress(Event):
     def __init__(self, key: int, modifiers: Optional[int] = None):
@@ -32,6 +56,9 @@ class KeyPress(Event):
     def get_id(self):
         return type(self), self.key
 
+    def get_input_id(self, joysticks) -> int:
+        return input_id(KEY_PRESS, 0, self.key)
+
     def __str__(self) -> str:
         return chr(self.key)
 
@@ -50,6 +77,9 @@ class KeyRelease(Event):
     def get_id(self):
         return type(self), self.key
 
+    def get_input_id(self, joysticks) -> int:
+        return input_id(KEY_RELEASE, 0, self.key)
+
 
 class JoyButtonPress(Event):
     def __init__(self, joy: arcade.joysticks.pyglet.input.base.Joystick, button: int):
@@ -62,6 +92,9 @@ class JoyButtonPress(Event):
     def get_id(self):
         return type(self), self.joy, self.button
 
+    def get_input_id(self, joysticks) -> int:
+        return input_id(JOY_BUTTON_PRESS, joysticks.index(self.joy) + 1, self.button)
+
     def __str__(self) -> str:
         return 'JoyBtn{}'.format(self.button)
 
@@ -80,6 +113,9 @@ class JoyButtonRelease(Event):
     def get_id(self):
         return type(self), self.joy, self.button
 
+    def get_input_id(self, joysticks) -> int:
+        return input_id(JOY_BUTTON_RELEASE, joysticks.index(self.joy) + 1, self.button)
+
 
 class JoyHatMotion(Event):
     def __init__(self, joy: arcade.joysticks.pyglet.input.base.Joystick, hatx: int, haty: int):
@@ -94,5 +130,8 @@ class JoyHatMotion(Event):
     def get_id(self):
         return type(self), self.joy
 
+    def get_input_id(self, joysticks) -> int:
+        return input_id(JOY_HAT_MOTION, joysticks.index(self.joy) + 1)
+
     def __str__(self) -> str:
         return 'JoyHat'
@@ -1,326 +1,308 @@
+import functools
 import os
 import os.path
+import random
+from typing import Callable, Dict, List, Optional, Tuple
 
 import arcade
 
-from gnp.arcadelib.timers import Timers
-from gnp.arcadelib.actor import ActorList
 from gnp.arcadelib import scriptutl
+from gnp.arcadelib.inputqueue import InputQueue, LatencyLog
+from gnp.arcadelib.text import Label
+from gnp.arcadelib.timestep import FixedTimestep
+from flapping import avatars
 from flapping import flapping_cfg as CFG
 from flapping import event
-from flapping import collision
-from flapping.player import Player
 from flapping.registration import Registration
-
-
-CIRCLE_TEXTURE = arcade.make_soft_circle_texture(diameter=20, color=arcade.color.WHITE)
+from flapping.replay import Recorder
+from flapping.simulation import Simulation
 
 
 class Game(arcade.Window):
-    # game states
-    WELCOME = 'welcome'
-    REGISTRATION = 'registration'
-    PLAY = 'gameplay'
-    SCOREBOARD = 'scoreboard'
+    """Window that draws a Simulation and feeds input to it"""
 
     def on_resize(self, width: float, height: float):
         # prevent arcade.Window.on_resize from changing the viewport on startup
         pass
 
     def __init__(self, width, height, title, fullscreen):
-        super().__init__(width, height, title, fullscreen)
+        super().__init__(width, height, title, fullscreen, update_rate=1 / CFG.Window.frame_rate)
         if self.fullscreen:
             self.set_viewport(0, width, 0, height)  # scale viewport to full screen (doesn't preserve aspect ratio)
         else:
             self.set_location(250, 35)
 
+        self.sim = Simulation(width, height)
+        self.sim.clock.scale = CFG.Game.time_scale
+        self.timestep = FixedTimestep(CFG.Game.tick_rate, CFG.Game.max_ticks_per_frame)
+        self.recorder: Optional[Recorder] = None
         self.script = self.game_script()
         self.reg = Registration(self, height)
 
-        self.round_num = 0
-        self.winners = []
-
         self.window_width = width
         self.window_height = height
         arcade.set_background_color((178, 198, 232))
 
-        self.player_list = arcade.SpriteList()
-        self.gameplay_input = {
-            event.KeyPress(arcade.key.ESCAPE).get_id(): self.close,
+        # text of each screen, re-rendered only when it changes
+        self.welcome_labels = (
+            Label(100, 400, arcade.color.GRAY, 100, 'Flapping Game'),
+            Label(105, 405, arcade.color.GREEN, 100, 'Flapping Game'),
+        )
+        self.scores_label = Label(50, 5, arcade.color.WHITE, 20)
+        self.scores_shown: Optional[int] = None  # sim.score_changed.count when scores_label was last updated
+        self.scoreboard_labels = (
+            Label(100, height - 100, CFG.UI.HEADER_COLOR, 60),  # header
+            Label(100, height - 150, CFG.UI.HEADER_COLOR, 36),  # footer
+            Label(100, 200, CFG.UI.BODY_COLOR, 38),  # scores
+        )
+        self.scoreboard_shown: Optional[Tuple[int, int]] = None  # (round, score_changed.count) of scoreboard_labels
+        self.continue_label = Label(100, 50, CFG.UI.HEADER_COLOR, 24, 'Press any input to continue...')
+        self.profiler_label = Label(10, height - 10, arcade.color.BLACK, 12, anchor_y='top')  # profiler overlay
+
+        # Gameplay input is queued as it arrives and applied at the start of the next update(), keyed by
+        # event.input_id(). Registration input is handled as it arrives, as event.Event objects.
+        self.gameplay_input: Dict[int, Callable] = {
+            event.input_id(event.KEY_PRESS, 0, arcade.key.ESCAPE): self.close,
         }
+        self.input_queue = InputQueue(CFG.Input.queue_size)
+        self.input_to_state = LatencyLog('input to state', CFG.Input.latency_samples)  # arrival -> action applied
+        self.input_to_frame = LatencyLog('input to frame', CFG.Input.latency_samples)  # arrival -> frame shown
+        self.unshown_inputs: List[float] = []  # arrival times of the inputs applied since the last frame shown
 
-        self.fx_actors = ActorList()
+        # Slower startup work is left until the first frame is up (see on_first_frame_drawn)
+        self.frames_drawn = 0
+        self.joysticks: Optional[list] = None  # gamepads, once they have been searched for
+        self.controllers_found = scriptutl.Signal()  # fired when self.joysticks is set
 
-        # gamepad setup
-        self.joysticks = arcade.joysticks.get_game_controllers()
-        if self.joysticks:
-            for joy in self.joysticks:
-                print('Found joystick: ', joy.device)
-                joy.open()
-                joy.on_joybutton_press = self.on_joybutton_press
-                joy.on_joybutton_release = self.on_joybutton_release
-                joy.on_joyhat_motion = self.on_joyhat
-
-        self.timers: Timers = Timers()
-        self.script_sched: scriptutl.Scheduler = scriptutl.Scheduler()
         next(self.script)  # step gameplay script when everything is initialized
 
-    def setup(self, map_name):
-        # map
-        map_name = 'resources/map/' + map_name
-        print('Loading map: {}'.format(map_name))
-        self.map = arcade.tilemap.read_tmx(map_name)
-        self.walls = arcade.tilemap.process_layer(self.map, 'walls', 1.0)
-        self.killers = arcade.tilemap.process_layer(self.map, 'kill', 1.0)
-
-        # players
-        x = 100
-        for p in self.player_list:
-            p.setup()
-            p.center_x = x
-            p.center_y = 120
-            p.change_x = 0.0
-            p.change_y = 0.0
-            p.score = 0
-            x += 100
-
-    def setup_new_round(self):
-        for p in self.player_list:
-            p.round_wins = 0
-
-    def on_round_end(self):
-        # find max score, reward
-        max_score = max([p.score for p in self.player_list])
-        for p in self.player_list:
-            if p.score == max_score:
-                p.round_wins += 1
-                print(f'{p.name} wins round with {p.score} points. Has now won {p.round_wins} rounds.')
-
-        max_round_wins = max([p.round_wins for p in self.player_list])
-        self.winners = [p for p in self.player_list if p.round_wins == max_round_wins]
+    def on_first_frame_drawn(self):
+        """Startup work that doesn't need to hold up the first frame"""
+        avatars.prewarm(CFG.Registration.avatars.values())  # done by the time registration needs them
+        self.find_joysticks()
+
+    def find_joysticks(self):
+        # Searching for gamepads can take a noticeable time. It is done on the main thread, as pyglet's input
+        # devices aren't safe to use from other threads on every platform.
+        self.joysticks = arcade.joysticks.get_game_controllers()
+        for device, joy in enumerate(self.joysticks, 1):  # device number of event.input_id()
+            print('Found joystick: ', joy.device)
+            joy.open()
+            joy.on_joybutton_press = functools.partial(self.on_joybutton_press, device)
+            joy.on_joybutton_release = functools.partial(self.on_joybutton_release, device)
+            joy.on_joyhat_motion = functools.partial(self.on_joyhat, device)
+        self.controllers_found.fire(self.joysticks)
 
     def game_script(self):
         """Generator-based game "script" that drives the game through its main states"""
         if CFG.Game.debug:
             # quick start game w/ no welcome or registration
+            yield from scriptutl.wait_until(lambda: self.joysticks is not None, self.controllers_found)
             self.reg.load_players()
             self.reg.finalize()
             CFG.Game.goal_score = 1
         else:
-            self.state = Game.WELCOME
-            yield from scriptutl.sleep(1.0)
-
-            self.state = Game.REGISTRATION
-            yield from scriptutl.wait_until(lambda: self.reg.done)
-
-        while True:
-            self.setup_new_round()
-            for round_idx in range(CFG.Game.rounds):
-                self.round_num = round_idx + 1
-                self.setup(CFG.Game.maps[round_idx % len(CFG.Game.maps)])
-                self.state = Game.PLAY
-                yield from scriptutl.wait_until(self.is_game_over)
-                self.on_round_end()
-                yield from scriptutl.sleep(1.0)  # give player a chance to see the effects of their action (and let FX play)
-                self.fx_actors.clear()
-
-                self.state = Game.SCOREBOARD
-                # blackout input briefly so that any final, furious button mashing doesn't unintentionally skip the scoreboard
-                self.scoreboard_sub_state = 'blackout'
-                yield from scriptutl.sleep(1.0)
-                self.scoreboard_sub_state = 'ready'
-                yield from scriptutl.wait_until(lambda: self.scoreboard_sub_state == 'done')
+            self.sim.state = Simulation.WELCOME
+            yield from scriptutl.sleep(1.0, self.sim.clock)
+
+            self.sim.state = Simulation.REGISTRATION
+            yield from scriptutl.wait_until(lambda: self.reg.done, self.reg.completed)
+
+        seed = random.randrange(2 ** 32)
+        self.recorder = Recorder(CFG.Game.replay_filename, self.sim, seed)
+        yield from self.sim.match_script(seed)
+
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+        super().close()
+
+    def apply_input(self) -> None:
+        """Apply the gameplay input queued since the last update, in the order it arrived.
+
+        Done before the frame's ticks, so input is recorded for replay with the tick that it is applied on."""
+        sim = self.sim
+        for input_id, hatx, haty, arrival in self.input_queue.drain():
+            applied = False
+            if sim.state == Simulation.PLAY:
+                if event.input_kind(input_id) == event.JOY_HAT_MOTION:
+                    applied = self.on_gameplay_input(input_id, hatx, haty)
+                else:
+                    applied = self.on_gameplay_input(input_id)
+            elif sim.state == Simulation.SCOREBOARD and sim.scoreboard_sub_state == 'ready':
+                if event.input_kind(input_id) in event.PRESS_KINDS:
+                    applied = self.on_scoreboard_input(input_id)
+            if applied:
+                self.input_to_state.record_since(arrival)
+                self.unshown_inputs.append(arrival)
+
+    def on_gameplay_input(self, input_id: int, *args) -> bool:
+        """Call the action mapped to the given input (if any), recording it for replay. Returns if there was one."""
+        action = self.gameplay_input.get(input_id)
+        if action is None:
+            return False
+        if self.recorder:
+            self.recorder.record(action, *args)
+        action(*args)
+        return True
+
+    def on_scoreboard_input(self, input_id: int) -> bool:
+        if input_id not in self.gameplay_input:
+            return False
+        if self.recorder:
+            self.recorder.record_continue()
+        self.sim.scoreboard_sub_state = 'done'
+        return True
 
     def on_draw(self):
+        sim = self.sim
+        prof = sim.profiler
+        prof.start()
         arcade.start_render()
-        if self.state == Game.WELCOME:
-            arcade.draw_text('Flapping Game', 100, 400, arcade.color.GRAY, 100)
-            arcade.draw_text('Flapping Game', 105, 405, arcade.color.GREEN, 100)
-        elif self.state == Game.REGISTRATION:
+        prof.lap('draw clear')
+        if sim.state == Simulation.WELCOME:
+            for label in self.welcome_labels:
+                label.draw()
+            prof.lap('draw text')
+        elif sim.state == Simulation.REGISTRATION:
             self.reg.on_draw()
-        elif self.state == Game.PLAY:
-            self.walls.draw()
-            self.killers.draw()
-            self.player_list.draw()
+            prof.lap('draw registration')
+        elif sim.state == Simulation.PLAY:
+            sim.walls.draw()
+            prof.lap('draw walls')
+            sim.killers.draw()
+            prof.lap('draw killers')
+            sim.active_players.draw()
+            prof.lap('draw players')
             self.draw_scores()
-        elif self.state == Game.SCOREBOARD:
-            sorted_player_list = sorted(self.player_list, key=lambda p: p.score, reverse=True)
-            if self.round_num == CFG.Game.rounds:
-                header = f'FINAL Scoreboard (round {self.round_num} of {CFG.Game.rounds})'
-                footer = 'Winners: ' + ','.join([p.name for p in self.winners])
-            else:
-                header = f'Scoreboard (round {self.round_num} of {CFG.Game.rounds})'
-                footer = None
-            arcade.draw_text(header, 100, self.window_height - 100, CFG.UI.HEADER_COLOR, 60)
-            if footer:
-                arcade.draw_text(footer, 100, self.window_height - 150, CFG.UI.HEADER_COLOR, 36)
-
-            lines = [f'{p.name}: {p.score} points, {p.round_wins} rounds' for p in sorted_player_list]
-            arcade.draw_text('\n'.join(lines), 100, 200, CFG.UI.BODY_COLOR, 38)
-            if self.scoreboard_sub_state == 'ready':
-                arcade.draw_text('Press any input to continue...', 100, 50, CFG.UI.HEADER_COLOR, 24)
-        self.fx_actors.draw()
+            prof.lap('draw text')
+        elif sim.state == Simulation.SCOREBOARD:
+            self.draw_scoreboard()
+            prof.lap('draw text')
+        sim.fx_actors.draw()
+        prof.lap('draw fx')
+        for pool in sim.particle_pools:
+            pool.draw()
+        prof.lap('draw particles')
+        if prof.enabled:
+            self.draw_profiler()
+            prof.lap('draw profiler')
+        prof.end_frame()
+        self.frames_drawn += 1
+
+    def flip(self):
+        super().flip()
+        # the frame drawn after an input was applied is now on screen
+        if self.unshown_inputs:
+            for arrival in self.unshown_inputs:
+                self.input_to_frame.record_since(arrival)
+            self.unshown_inputs.clear()
+
+    def draw_profiler(self):
+        """Overlay of the time taken by each phase of the frame over the recent frames"""
+        prof = self.sim.profiler
+        if prof.frame_count % 30 == 0:  # the statistics barely change from frame to frame
+            lines = [f'{len(prof.frames())} frames (ms)']
+            for stats in prof.summary() + self.latency_summary():
+                lines.append('{phase}: p50 {p50_ms:.2f}  p95 {p95_ms:.2f}  p99 {p99_ms:.2f}'.format(**stats))
+            self.profiler_label.text = '\n'.join(lines)
+        self.profiler_label.draw()
+
+    def latency_summary(self) -> List[Dict]:
+        return [self.input_to_state.summary(), self.input_to_frame.summary()]
+
+    def toggle_profiler(self):
+        prof = self.sim.profiler
+        prof.enabled = not prof.enabled
+        if prof.enabled:
+            prof.clear()
 
     def on_key_press(self, key, modifiers):
-        evt = event.KeyPress(key, modifiers)
-        if self.state == Game.REGISTRATION:
-            self.reg.on_event(evt)
-        elif self.state == Game.PLAY:
-            if evt.get_id() in self.gameplay_input:
-                self.gameplay_input[evt.get_id()]()
-        elif self.state == Game.SCOREBOARD and self.scoreboard_sub_state == 'ready':
-            if evt.get_id() in self.gameplay_input:
-                self.scoreboard_sub_state = 'done'
+        if self.sim.state == Simulation.REGISTRATION:
+            self.reg.on_event(event.KeyPress(key, modifiers))
+            return
+        input_id = event.input_id(event.KEY_PRESS, 0, key)
+        # the profiler keys can be registered as player keys, which then take precedence
+        if key == CFG.Profiler.toggle_key and input_id not in self.gameplay_input:
+            self.toggle_profiler()
+        elif key == CFG.Profiler.dump_key and input_id not in self.gameplay_input:
+            self.sim.profiler.dump(CFG.Profiler.dump_filename, self.latency_summary())
+            print(f'Wrote frame profile to: {CFG.Profiler.dump_filename}')
+        else:
+            self.input_queue.push(input_id)
 
     def on_key_release(self, key, modifiers):
-        evt = event.KeyRelease(key, modifiers)
-        if self.state == Game.PLAY:
-            if evt.get_id() in self.gameplay_input:
-                self.gameplay_input[evt.get_id()]()
-
-    def on_joybutton_press(self, joy, button):
-        evt = event.JoyButtonPress(joy, button)
-        if self.state == Game.REGISTRATION:
-            self.reg.on_event(evt)
-        elif self.state == Game.PLAY:
-            if evt.get_id() in self.gameplay_input:
-                self.gameplay_input[evt.get_id()]()
-        elif self.state == Game.SCOREBOARD and self.scoreboard_sub_state == 'ready':
-            if evt.get_id() in self.gameplay_input:
-                self.scoreboard_sub_state = 'done'
-
-    def on_joybutton_release(self, joy, button):
-        evt = event.JoyButtonRelease(joy, button)
-        if self.state == Game.PLAY:
-            if evt.get_id() in self.gameplay_input:
-                self.gameplay_input[evt.get_id()]()
-
-    def on_joyhat(self, joy, hatx, haty):
+        if self.sim.state != Simulation.REGISTRATION:
+            self.input_queue.push(event.input_id(event.KEY_RELEASE, 0, key))
+
+    # The joystick handlers are bound with the joystick's device number (see find_joysticks)
+    def on_joybutton_press(self, device, joy, button):
+        if self.sim.state == Simulation.REGISTRATION:
+            self.reg.on_event(event.JoyButtonPress(joy, button))
+        else:
+            self.input_queue.push(event.input_id(event.JOY_BUTTON_PRESS, device, button))
+
+    def on_joybutton_release(self, device, joy, button):
+        if self.sim.state != Simulation.REGISTRATION:
+            self.input_queue.push(event.input_id(event.JOY_BUTTON_RELEASE, device, button))
+
+    def on_joyhat(self, device, joy, hatx, haty):
         # Many gamepads must be in "analog" mode for the "hat" to report values
-        evt = event.JoyHatMotion(joy, hatx, haty)
-        if self.state == Game.REGISTRATION:
+        if self.sim.state == Simulation.REGISTRATION:
             if hatx != 0:
-                self.reg.on_event(evt)
-        elif self.state == Game.PLAY:
-            if evt.get_id() in self.gameplay_input:
-                self.gameplay_input[evt.get_id()](hatx, haty)
+                self.reg.on_event(event.JoyHatMotion(joy, hatx, haty))
+        else:
+            self.input_queue.push(event.input_id(event.JOY_HAT_MOTION, device), hatx, haty)
 
     def update(self, delta_time):
-        self.timers.update(delta_time)
-        self.script_sched.update()
-        self.fx_actors.update(delta_time)
-        if self.state == Game.WELCOME:
-            pass
-        elif self.state == Game.REGISTRATION:
+        """Called once per displayed frame. Runs as many fixed-size ticks as the elapsed time calls for.
+
+        The game clock's scale and pause are applied here, so a faster clock runs more ticks per frame and a
+        paused one runs none."""
+        if self.joysticks is None and self.frames_drawn > 0:
+            self.on_first_frame_drawn()
+        self.apply_input()
+        for _ in range(self.timestep.advance(self.sim.clock.to_game_time(delta_time))):
+            self.tick(self.timestep.dt)
+
+    def tick(self, delta_time):
+        self.sim.update(delta_time)
+        if self.sim.state == Simulation.REGISTRATION:
             try:
                 next(self.reg.script)
             except StopIteration:
                 pass
-        elif self.state == Game.PLAY:
-            self.player_list.update()
-
-            # Prevent partial-pixel positioning, which can cause edge artifacts on player sprites.
-            # This also makes it a bit easier for a player to completely stop the motion of their Player.
-            for player in self.player_list:
-                player.center_x = int(player.center_x)
-                player.center_y = int(player.center_y)
-
-            for p in self.player_list:
-                self.check_killer_tiles_collision(p, self.killers)
-                self.check_wall_tiles_collision(p, self.walls)
-            for p in self.player_list:
-                p.change_y -= 0.2  # gravity
-                if p.center_x < 0:
-                    p.center_x = self.window_width
-                elif p.center_x > self.window_width:
-                    p.center_x = 0
-            self.check_player_collision()
         try:
             next(self.script)
         except StopIteration:
             self.close()
-
-    def make_player_death_emitter(self, player):
-        return arcade.make_burst_emitter(
-            (player.center_x, player.center_y),
-            [CIRCLE_TEXTURE],
-            particle_count=15,
-            particle_speed=5.0,
-            particle_lifetime_min=0.1,
-            particle_lifetime_max=0.2,
-            fade_particles=True
-        )
-
-    def check_killer_tiles_collision(self, player: Player, killers):
-        hit_list = arcade.check_for_collision_with_list(player, killers)
-        if len(hit_list) > 0:
-            player.score += CFG.Player.death_score
-            self.fx_actors.append(self.make_player_death_emitter(player))
-            self.script_sched.add(player.death_script())
-
-    def check_wall_tiles_collision(self, player: Player, walls):
-        hit_wall_list = arcade.check_for_collision_with_list(player, walls)
-        if len(hit_wall_list) > 0:
-            for wall in hit_wall_list:
-                hit = collision.intersect_AABB(player, wall)
-                if hit is None:
-                    continue
-                if hit.normal[0] > 0 or hit.normal[0] < 0:  # from right or left
-                    player.center_x += hit.delta[0]
-                    player.change_x = 0
-                if hit.normal[1] > 0:  # hit top of wall
-                    player.bottom = wall.top - 1
-                    player.change_y = 0
-                    player.set_landed()
-                if hit.normal[1] < 0:  # hit bottom of wall
-                    player.center_y += hit.delta[1]
-                    player.change_y = -3.0
-        else:
-            player.set_flying()
-
-    def check_player_collision(self) -> None:
-        p1: Player
-        for idx1, p1 in enumerate(self.player_list):
-            for idx2 in range(idx1 + 1, len(self.player_list)):
-                p2: Player = self.player_list[idx2]
-                if p1.is_alive and p2.is_alive:
-                    if arcade.check_for_collision(p1, p2):
-                        if int(p1.center_y) == int(p2.center_y):
-                            # equal collision
-                            if p1.center_x < p2.center_x:
-                                p1.center_x += -1
-                                p1.change_x = -0.5
-                                p1.change_y = 0.0
-                                p2.center_x += 1
-                                p2.change_x = 0.5
-                                p2.change_y = 0.0
-                            else:
-                                p1.center_x += 1
-                                p1.change_x = 0.5
-                                p1.change_y = 0.0
-                                p2.center_x += -1
-                                p2.change_x = -0.5
-                                p2.change_y = 0.0
-                        elif p1.center_y > p2.center_y:
-                            p1.score += CFG.Player.kill_score
-                            self.fx_actors.append(self.make_player_death_emitter(p2))
-                            self.script_sched.add(p2.death_script())
-                        elif p2.center_y > p1.center_y:
-                            p2.score += CFG.Player.kill_score
-                            self.fx_actors.append(self.make_player_death_emitter(p1))
-                            self.script_sched.add(p1.death_script())
-
-    def print_scores(self):
-        for p in self.player_list:
-            print('{}: {}'.format(p.name, p.score))
-
-    def is_game_over(self):
-        scores = [p.score for p in self.player_list]
-        return max(scores) >= CFG.Game.goal_score
+        self.sim.profiler.lap('game scripts')
 
     def draw_scores(self):
-        labels = ['{}: {}'.format(p.name, p.score) for p in self.player_list]
-        arcade.draw_text('    '.join(labels), 50, 5, arcade.color.WHITE, 20)
+        if self.scores_shown != self.sim.score_changed.count:
+            self.scores_shown = self.sim.score_changed.count
+            labels = ['{}: {}'.format(p.name, p.score) for p in self.sim.player_list]
+            self.scores_label.text = '    '.join(labels)
+        self.scores_label.draw()
+
+    def draw_scoreboard(self):
+        sim = self.sim
+        # The scoreboard is only shown between rounds, when no scores change, so its text is built once per round
+        if self.scoreboard_shown != (sim.round_num, sim.score_changed.count):
+            self.scoreboard_shown = (sim.round_num, sim.score_changed.count)
+            sorted_player_list = sorted(sim.player_list, key=lambda p: p.score, reverse=True)
+            if sim.round_num == CFG.Game.rounds:
+                self.scoreboard_labels[0].text = f'FINAL Scoreboard (round {sim.round_num} of {CFG.Game.rounds})'
+                self.scoreboard_labels[1].text = 'Winners: ' + ','.join([p.name for p in sim.winners])
+            else:
+                self.scoreboard_labels[0].text = f'Scoreboard (round {sim.round_num} of {CFG.Game.rounds})'
+                self.scoreboard_labels[1].text = ''
+            lines = [f'{p.name}: {p.score} points, {p.round_wins} rounds' for p in sorted_player_list]
+            self.scoreboard_labels[2].text = '\n'.join(lines)
+        for label in self.scoreboard_labels:
+            label.draw()
+        if sim.scoreboard_sub_state == 'ready':
+            self.continue_label.draw()
 
 
 def main() -> None:
@@ -32,11 +32,21 @@ class Registration:
 
 class Window:
     fullscreen = False
+    frame_rate = 60  # how often the screen is drawn, independent of Game.tick_rate
 
 
 class Game:
     debug = False
+    # step all players with batched NumPy operations. Only faster with a few dozen players or more (see flapping.physics)
+    vector_physics = False
+    tick_rate = 60  # simulation ticks per second. Speeds in Player are tuned as "per tick" at this rate.
+    max_ticks_per_frame = 5  # limit on catch-up ticks after a long frame. The game slows down beyond this.
+    time_scale = 1.0  # game seconds per real second. Also capped by max_ticks_per_frame.
+    replay_filename = 'flapping.last_replay'  # input of the last match is recorded here (see flapping.replay)
     goal_score = 10
+    # Debug check for leaks: fail when a count of live actors, scripts or timers has grown in each of this many
+    # rounds in a row (see Simulation.live_counts). 0 turns the check off.
+    leak_check_rounds = 0
     maps = ('map1.tmx', 'map2.tmx', 'map3.tmx', 'map4.tmx', 'map5.tmx')
     rounds = len(maps) * 2
 
@@ -47,12 +57,31 @@ class Player:
     max_horiz_speed = 5.0
     max_vert_speed = 7.0
     jump_speed = 3
+    gravity = 0.2
     filename = 'flapping.last_players'
     respawn_delay = 1.0
     kill_score = 2
     death_score = -1
 
 
+class FX:
+    max_particles = 2048  # capacity of each particle pool. Particles emitted beyond this are dropped.
+
+
+class Profiler:
+    enabled = False  # time the phases of each frame from startup. Toggled in game with toggle_key.
+    frames = 600  # number of most recent frames kept
+    # Profiler keys work outside of registration, unless a player registered them as one of their keys
+    toggle_key = arcade.key.F3  # turns the profiler and its overlay on and off
+    dump_key = arcade.key.F4  # writes the recorded frames to dump_filename
+    dump_filename = 'flapping.profile.json'  # written as CSV if it ends in .csv
+
+
+class Input:
+    queue_size = 256  # gameplay input events held between frames. Any beyond this are dropped.
+    latency_samples = 1000  # most recent input latencies kept, shown with the profiler (see Profiler)
+
+
 class UI:
     HEADER_COLOR = arcade.color.FOREST_GREEN
     BODY_COLOR = arcade.color.DARK_BROWN
@@ -0,0 +1,306 @@
+"""Maps of the Flapping game, loaded once and shared by every round that plays them
+
+Maps are made in Tiled and saved as .tmx files. They can be compiled into a binary .flapmap file next to each
+.tmx, which loads without parsing any XML:
+
+    python -m flapping.maps [map.tmx ...]  # with no arguments, compiles every map in resources/map
+
+A compiled map is used instead of its .tmx as long as it is newer than the .tmx and its tilesets. One that is out
+of date or can't be read (ex: it was compiled to an older version of the format) is compiled again when loaded.
+
+The .flapmap format (little-endian):
+    magic (8 bytes), format version (uint32), header length (uint32)
+    header: JSON with the map size, the source files, the image of each tile used and, for each layer, the
+            offsets of its data below (from the end of the header)
+    per layer: the tile grid, a uint16 gid per cell with row 0 at the bottom, and the layer's tiles merged into
+               rectangles (int32 left, bottom, width, height, in pixels)
+Arrays are 8 byte aligned, so they are used straight from the memory mapped file.
+"""
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import os.path
+import struct
+import xml.etree.ElementTree
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import arcade
+import numpy as np
+import pytiled_parser
+
+from flapping.collision import Rect
+from flapping.tilegrid import TileGrid, merge_cells
+
+COMPILED_EXTENSION = '.flapmap'
+_MAGIC = b'FLAPMAP\0'
+_VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')  # magic, version, header length
+_LAYERS = ('walls', 'kill')
+
+
+class LoadedMap(NamedTuple):
+    """The tiles of a map, ready to play. Nothing in it is changed by gameplay, so it can be reused."""
+    walls: arcade.SpriteList
+    killers: arcade.SpriteList
+    tile_grid: TileGrid
+
+
+class MapSource(NamedTuple):
+    """A map's files, read and parsed, that its Sprites haven't been made from yet (see read_map())"""
+    filename: str
+    tile_map: Optional[pytiled_parser.objects.TileMap]  # a parsed .tmx,
+    header: Optional[Dict]  # or the header and layer data of a compiled map
+    data: Optional[np.ndarray]
+
+
+def load_map(filename: str) -> LoadedMap:
+    """Load a .tmx map, from its compiled version if there is one"""
+    return build_map(read_map(filename))
+
+
+def load_tmx(filename: str) -> LoadedMap:
+    return build_map(_read_tmx(filename))
+
+
+def read_map(filename: str) -> MapSource:
+    """Read a .tmx map's files, from its compiled version if there is one. The .tmx is only read when the map
+    can't be compiled.
+
+    This is the part of loading that can be done on a worker thread: it makes no Sprites or SpriteLists, which
+    may create OpenGL objects (depending on the arcade version) and those belong to the main thread."""
+    compiled = os.path.splitext(filename)[0] + COMPILED_EXTENSION
+    if not os.path.exists(compiled):
+        return _read_tmx(filename)
+    source = _read_if_current(filename, compiled)
+    if source is None:
+        try:
+            compile_map(filename)
+        except (OSError, ValueError) as exc:
+            print(f'WARNING: Could not recompile {filename}, so loading the .tmx. {type(exc).__name__}: {exc}')
+            return _read_tmx(filename)
+        print(f'Recompiled: {compiled}')
+        source = _compiled_source(filename, compiled, *_open_compiled(compiled))
+    return source
+
+
+def build_map(source: MapSource) -> LoadedMap:
+    """Make the Sprites of a map that read_map() has read. Done on the main thread."""
+    if source.tile_map is not None:
+        walls = arcade.tilemap.process_layer(source.tile_map, 'walls', 1.0)
+        killers = arcade.tilemap.process_layer(source.tile_map, 'kill', 1.0)
+        return LoadedMap(walls, killers, TileGrid.from_tile_map(source.tile_map, walls, killers))
+    assert source.header is not None and source.data is not None
+    return _build_compiled(source.header, source.data)
+
+
+def _read_tmx(filename: str) -> MapSource:
+    print('Loading map: {}'.format(filename))
+    return MapSource(filename, arcade.tilemap.read_tmx(filename), None, None)
+
+
+def _read_if_current(filename: str, compiled: str) -> Optional[MapSource]:
+    """Read a compiled map, unless it can't be read or is older than its sources"""
+    try:
+        header, data = _open_compiled(compiled)
+    except (ValueError, struct.error) as exc:
+        print(f'Ignoring {compiled}: {exc}')
+        return None
+    compiled_time = os.path.getmtime(compiled)
+    sources = [os.path.join(os.path.dirname(compiled), src) for src in header['sources']]
+    if any(os.path.exists(src) and os.path.getmtime(src) > compiled_time for src in sources):
+        print(f'Ignoring {compiled}, as it is older than its sources')
+        return None
+    return _compiled_source(filename, compiled, header, data)
+
+
+def _compiled_source(filename: str, compiled: str, header: Dict, data: np.ndarray) -> MapSource:
+    print('Loading map: {}'.format(compiled))
+    for image in header['images'].values():
+        # the textures that the map's Sprites will use, from arcade's cache. Only uploaded to the GPU when drawn.
+        arcade.load_texture(image['file'], image['x'], image['y'], image['width'], image['height'])
+    return MapSource(filename, None, header, data)
+
+
+def _open_compiled(filename: str) -> Tuple[Dict, np.ndarray]:
+    """Return the header and the memory mapped layer data of a compiled map"""
+    data = np.memmap(filename, dtype=np.uint8, mode='r')  # ValueError if the file is empty
+    magic, version, header_len = _PREAMBLE.unpack_from(data[:_PREAMBLE.size].tobytes())
+    if magic != _MAGIC:
+        raise ValueError(f'{filename} is not a compiled map')
+    if version != _VERSION:
+        raise ValueError(f'{filename} is version {version} of the compiled map format, not {_VERSION}')
+    header = json.loads(data[_PREAMBLE.size:_PREAMBLE.size + header_len].tobytes())
+    return header, data[_PREAMBLE.size + header_len:]
+
+
+def _build_compiled(header: Dict, data: np.ndarray) -> LoadedMap:
+    cols = header['cols']
+    rows = header['rows']
+    tile_width = header['tile_width']
+    tile_height = header['tile_height']
+    images = {int(gid): image for gid, image in header['images'].items()}
+    sprite_lists = []
+    for name in _LAYERS:
+        layer = header['layers'][name]
+        grid = np.frombuffer(data, np.uint16, rows * cols, layer['grid']).reshape(rows, cols)
+        sprites = arcade.SpriteList()
+        for row in range(rows - 1, -1, -1):  # top to bottom, the order the .tmx lists them in
+            for col in np.flatnonzero(grid[row]).tolist():
+                image = images[int(grid[row, col])]
+                sprite = arcade.Sprite(image['file'], 1.0, image['x'], image['y'], image['width'], image['height'])
+                sprite.center_x = col * tile_width + sprite.width / 2
+                sprite.center_y = row * tile_height + sprite.height / 2
+                sprites.append(sprite)
+        sprite_lists.append(sprites)
+    walls, killers = sprite_lists
+    rects = np.frombuffer(data, np.int32, header['layers']['walls']['rect_count'] * 4,
+                          header['layers']['walls']['rects']).reshape(-1, 4)
+    wall_rects = [Rect(*rect) for rect in rects.tolist()]
+    return LoadedMap(walls, killers, TileGrid(cols, rows, tile_width, tile_height, wall_rects, killers))
+
+
+def compile_map(filename: str) -> str:
+    """Compile a .tmx map into a .flapmap file next to it. Returns the name of the compiled file."""
+    tile_map = arcade.tilemap.read_tmx(filename)
+    cols = tile_map.map_size.width
+    rows = tile_map.map_size.height
+    tile_width = tile_map.tile_size.width
+    tile_height = tile_map.tile_size.height
+    map_dir = os.path.dirname(filename)
+    sources = [filename] + [os.path.join(map_dir, tileset.attrib['source'])
+                            for tileset in xml.etree.ElementTree.parse(filename).getroot().iter('tileset')
+                            if tileset.get('source')]
+
+    images: Dict[int, Dict] = {}
+    blobs: List[bytes] = []
+    layers = {}
+    offset = 0  # from the end of the header
+    for name in _LAYERS:
+        layer = arcade.tilemap.get_tilemap_layer(tile_map, name)
+        if layer is None:
+            raise ValueError(f'{filename} has no "{name}" layer')
+        if layer.opacity not in (None, 1.0):
+            raise ValueError(f'{filename}: layer opacity is not supported in compiled maps')
+        gids = np.array(layer.layer_data, dtype=np.int64)[::-1]  # flip, so row 0 is the bottom row
+        for gid in np.unique(gids[gids != 0]).tolist():
+            images[gid] = _tile_image(tile_map, gid, filename)
+        occupied = (gids != 0).ravel().tolist()  # no Sprites are made, so a worker thread can compile (see read_map())
+        rects = [(rect.left, rect.bottom, rect.width, rect.height)
+                 for rect in merge_cells(occupied, cols, rows, tile_width, tile_height)]
+        grid = gids.astype(np.uint16).tobytes()
+        rect_data = np.array(rects, dtype=np.int32).reshape(-1, 4).tobytes()
+        layers[name] = {'grid': offset, 'rects': offset + _aligned(len(grid)), 'rect_count': len(rects)}
+        blobs += [_pad(grid), _pad(rect_data)]
+        offset += _aligned(len(grid)) + _aligned(len(rect_data))
+
+    header = {
+        'sources': [os.path.relpath(src, map_dir) for src in sources],  # relative to the compiled file
+        'cols': cols,
+        'rows': rows,
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'images': images,
+        'layers': layers,
+    }
+    header_data = json.dumps(header).encode()
+    header_data = header_data.ljust(_aligned(len(header_data)))  # keeps the arrays after it aligned
+
+    out_filename = os.path.splitext(filename)[0] + COMPILED_EXTENSION
+    with open(out_filename, 'wb') as out_file:
+        out_file.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(header_data)))
+        out_file.write(header_data)
+        for blob in blobs:
+            out_file.write(blob)
+    return out_filename
+
+
+def _tile_image(tile_map, gid: int, filename: str) -> Dict:
+    """Image file and region that a tile's Sprite is made from, checking that it needs nothing more.
+
+    Found from the parsed tilesets, the way arcade.tilemap.process_layer() finds a tile's image."""
+    if gid > np.iinfo(np.uint16).max:
+        raise ValueError(f'{filename}: flipped tiles are not supported in compiled maps')
+    first_gids = [first_gid for first_gid in tile_map.tile_sets if first_gid <= gid]
+    if not first_gids:
+        raise ValueError(f'{filename}: no tile for gid {gid}')
+    tileset = tile_map.tile_sets[max(first_gids)]  # the tileset that a gid belongs to is the last to start before it
+    tile_id = gid - max(first_gids)
+    tile = tileset.tiles.get(tile_id)
+    if tile is not None and (tile.animation or tile.objectgroup):
+        raise ValueError(f'{filename}: animated tiles and tile hit boxes are not supported in compiled maps')
+
+    if tile is not None and tile.image is not None:  # a tile with an image of its own
+        source = tile.image.source
+    elif tileset.image is not None and tile_id < tileset.tile_count:  # a tile of a sprite sheet
+        source = tileset.image.source
+    else:
+        raise ValueError(f'{filename}: no image for gid {gid}')
+    x = y = 0
+    if tileset.image is not None:
+        margin = tileset.margin or 0
+        spacing = tileset.spacing or 0
+        x = margin + tile_id % tileset.columns * (tileset.max_tile_size.width + spacing)
+        y = margin + tile_id // tileset.columns * (tileset.max_tile_size.height + spacing)
+    size = tile.image.size if tile is not None and tile.image is not None and tile.image.size else None
+    width, height = (size.width, size.height) if size else (tileset.max_tile_size.width,
+                                                             tileset.max_tile_size.height)
+
+    candidates = [source, os.path.join(os.path.dirname(filename), source)]
+    if tileset.parent_dir:
+        candidates.append(os.path.join(tileset.parent_dir, source))
+    image_file = next((path for path in candidates if os.path.exists(path)), None)
+    if image_file is None:
+        raise ValueError(f'{filename}: image {source} of gid {gid} not found')
+    return {'file': str(image_file), 'x': x, 'y': y, 'width': width, 'height': height}
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _pad(data: bytes) -> bytes:
+    return data.ljust(_aligned(len(data)), b'\0')
+
+
+class MapCache:
+    """Loads each map once, by name. prefetch() reads a map on a worker thread ahead of when it is needed.
+
+    Only the reading is done on the worker (see read_map()). The Sprites are made on the main thread, by the
+    get() that first asks for the map."""
+    def __init__(self, directory: str = 'resources/map/'):
+        self.directory = directory
+        self._maps: Dict[str, LoadedMap] = {}
+        self._reading: Dict[str, concurrent.futures.Future] = {}  # MapSource of each map being prefetched
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='map loader')
+
+    def prefetch(self, name: str) -> None:
+        """Start reading the named map in the background, unless it is already loaded or being read"""
+        if name not in self._maps and name not in self._reading:
+            self._reading[name] = self._executor.submit(read_map, self.directory + name)
+
+    def get(self, name: str) -> LoadedMap:
+        """The named map. Waits for it if it is being prefetched, and loads it if it wasn't."""
+        loaded = self._maps.get(name)
+        if loaded is None:
+            future = self._reading.pop(name, None)
+            source = future.result() if future is not None else read_map(self.directory + name)
+            loaded = self._maps[name] = build_map(source)
+        return loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compile .tmx maps into .flapmap files that load faster')
+    parser.add_argument('maps', nargs='*', help='.tmx files to compile (default: every map in resources/map)')
+    args = parser.parse_args()
+    filenames = [os.path.abspath(filename) for filename in args.maps]
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # tile images are found relative to the package
+    if not filenames:
+        filenames = sorted(glob.glob('resources/map/*.tmx'))
+    for filename in filenames:
+        print('Compiled: {}'.format(compile_map(filename)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,14 @@
 import random
 from typing import TYPE_CHECKING
 
-import PIL.Image
 import arcade
 
 from gnp.arcadelib import scriptutl
+from gnp.arcadelib.particles import ParticleStream
+from flapping import avatars
 from flapping import flapping_cfg as CFG
 if TYPE_CHECKING:
-    from flapping.flap_app import Game
-
-
-DUST_TEXTURE = arcade.make_soft_circle_texture(diameter=20, color=arcade.color.GRAY)
+    from flapping.simulation import Simulation
 
 
 class ControllableEmitInterval(arcade.EmitController):
@@ -49,49 +47,21 @@ class Player(arcade.Sprite):
     LEFT = 1
     NO_DIRECTION = 2
 
-    def __init__(self, img_path: str, name: str, clr: arcade.arcade_types.Color, game: "Game"):
+    def __init__(self, img_path: str, name: str, clr: arcade.arcade_types.Color, sim: "Simulation"):
         super().__init__()
-        self.game = game
+        self.sim = sim
         # self.change_x: float  # should be coming from arcade package
         # self.change_y: float  # should be coming from arcade package
         self.btn_left = False
         self.btn_right = False
         self.state: int = Player.FLYING
         self.dir: int = Player.NO_DIRECTION
-        self.skid_fx = self.make_dust_emitter()  # re-initialized in .setup()
         self.setup()
-        self.score = 0
+        self._score = 0  # see the score property
         self.name = name
         self.is_alive = True
-        print(f'Loading texture: {img_path}')
-        if img_path.endswith('player_blob.png') and clr is not None:
-            # replace colors
-            img = PIL.Image.open(img_path)
-            width, height = img.size
-
-            darker_clr = (
-                    int(clr[0] * 0.7),
-                    int(clr[1] * 0.7),
-                    int(clr[2] * 0.7)
-            )
-            for i, px in enumerate(img.getdata()):
-                if px == (65, 216, 0, 255):
-                    img.putpixel((i % width, i // width), clr + (255,))
-                elif px == (53, 178, 0, 255):
-                    img.putpixel((i % width, i // width), darker_clr + (255,))
-
-            # facing-right texture
-            cache_id = f'{img_path}-{clr}-right'
-            right_texture = arcade.Texture(cache_id, img)
-
-            # facing-left texture
-            img = img.transpose(PIL.Image.FLIP_LEFT_RIGHT)
-            cache_id = f'{img}-{clr}-left'
-            left_texture = arcade.Texture(cache_id, img)
-        else:
-            # no color replacing
-            right_texture = arcade.load_texture(img)
-            left_texture = arcade.load_texture(img, mirrored=True)
+        self.last_position = self.position  # position at the start of the current physics step
+        right_texture, left_texture = avatars.get_textures(img_path, clr)
         self.textures.append(right_texture)
         self.textures.append(left_texture)
         self.set_texture(Player.RIGHT)
@@ -103,13 +73,25 @@ class Player(arcade.Sprite):
         self.dir = Player.NO_DIRECTION
         self.change_x = 0.0
         self.change_y = 0.0
+        # replaces the stream of the previous round or life
+        self.sim.fx_actors.reset_owner(self)
         self.skid_fx = self.make_dust_emitter()
-        self.game.fx_actors.append(self.skid_fx)
+        self.sim.fx_actors.add_owned(self.skid_fx, self)
+
+    @property
+    def score(self) -> int:
+        return self._score
+
+    @score.setter
+    def score(self, score: int) -> None:
+        old_score = self._score
+        self._score = score
+        self.sim.on_score_changed(self, old_score)
 
     def death_script(self) -> scriptutl.GenScript:
         """Generator "script" that runs to manage the timing of a player's death"""
         self.kill()
-        yield from scriptutl.sleep(CFG.Player.respawn_delay)
+        yield from scriptutl.sleep(CFG.Player.respawn_delay, self.sim.clock)
         self.respawn()
 
     def on_up(self) -> None:
@@ -158,16 +140,15 @@ class Player(arcade.Sprite):
         else:
             self.dir = Player.NO_DIRECTION
 
-    def make_dust_emitter(self):
-        particle_factory = arcade.FadeParticle
-        return arcade.Emitter(
-            center_xy=(self.center_x, self.center_y),
-            emit_controller=ControllableEmitInterval(0.07),
-            particle_factory=lambda emitter: particle_factory(
-                filename_or_texture=random.choice([DUST_TEXTURE]),
-                change_xy=arcade.rand_vec_spread_deg(90, 20, 0.3),
-                lifetime=random.uniform(0.5, 0.7),
-            )
+    def make_dust_emitter(self) -> ParticleStream:
+        return ParticleStream(
+            self.sim.dust_particles,
+            ControllableEmitInterval(0.07),
+            angle_deg=90,
+            half_angle_spread_deg=20,
+            speed=0.3,
+            lifetime_min=0.5,
+            lifetime_max=0.7,
         )
 
     def set_landed(self) -> None:
@@ -180,10 +161,24 @@ class Player(arcade.Sprite):
             self.skid_fx.rate_factory.stop()
 
     def update(self) -> None:
+        self.last_position = self.position
         super().update()
         if not self.is_alive:
             return
 
+        self.update_skid_fx()
+        if self.state == Player.LANDED:
+            if self.dir == Player.LEFT:
+                self.change_x -= CFG.Player.movement_speed
+            elif self.dir == Player.RIGHT:
+                self.change_x += CFG.Player.movement_speed
+        self.change_x = min(self.change_x, CFG.Player.max_horiz_speed)
+        self.change_x = max(self.change_x, -CFG.Player.max_horiz_speed)
+        self.change_y = min(self.change_y, CFG.Player.max_vert_speed)
+        self.change_y = max(self.change_y, -CFG.Player.max_vert_speed)
+
+    def update_skid_fx(self) -> None:
+        """Keep skid dust under the Player, emitting only while skidding along the ground"""
         if self.skid_fx:
             self.skid_fx.center_x = self.center_x
             self.skid_fx.center_y = self.bottom
@@ -194,23 +189,17 @@ class Player(arcade.Sprite):
                 self.skid_fx.rate_factory.start()
             else:
                 self.skid_fx.rate_factory.stop()
-            if self.dir == Player.LEFT:
-                self.change_x -= CFG.Player.movement_speed
-            elif self.dir == Player.RIGHT:
-                self.change_x += CFG.Player.movement_speed
-        self.change_x = min(self.change_x, CFG.Player.max_horiz_speed)
-        self.change_x = max(self.change_x, -CFG.Player.max_horiz_speed)
-        self.change_y = min(self.change_y, CFG.Player.max_vert_speed)
-        self.change_y = max(self.change_y, -CFG.Player.max_vert_speed)
 
     def kill(self) -> None:
         self.is_alive = False
-        # Move offscreen so Player isn't seen. Probably better to remove from SpriteList.
-        self.center_x = -100
-        self.center_y = -100
+        # Dead players aren't updated, collided or drawn until they respawn
+        if self.sim.active_players in self.sprite_lists:
+            self.sim.active_players.remove(self)
 
     def respawn(self) -> None:
         self.is_alive = True
+        if self.sim.active_players not in self.sprite_lists:
+            self.sim.active_players.append(self)
         self.setup()
         self.center_x = random.randint(200, 1000)
         self.center_y = 75
@@ -1,16 +1,17 @@
+import functools
 import itertools
 import random
 import inspect
 import pickle
 import traceback
-from typing import Iterator, List, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 import arcade
 import pyglet
 
 from flapping import event
 from gnp.arcadelib import scriptutl
-from flapping.player import Player
+from gnp.arcadelib.text import Label
 from flapping import flapping_cfg as CFG
 
 
@@ -20,15 +21,43 @@ if TYPE_CHECKING:  # prevent circular import reference caused by type hinting
 
 class Registration:
     """Hacky class to store state related to the Registration state. Prob should be a "state" class or something."""
+    # input that is handled by the registration script itself, rather than being registered to a player
+    SKIPPABLE_EVENT_IDS = frozenset(event.KeyPress(k).get_id() for k in (arcade.key.ENTER, arcade.key.F5, arcade.key.ESCAPE))
+
     def __init__(self, game: "Game", win_height: int):
-        self.msg = '...'
         self.last_input: Optional[event.Event] = None
+        self.input_arrived = scriptutl.Signal()  # fired when last_input is set
         self.done = False
+        self.completed = scriptutl.Signal()  # fired when done is set
         self.entries: List["_RegistrationEntry"] = []
         self.win_height = win_height
         self.game = game
         self.script = self.registration_script()
 
+        self.msg_label = Label(25, win_height - 175, CFG.UI.HEADER_COLOR, 30)
+        self.summary_label = Label(25, win_height - 200, CFG.UI.BODY_COLOR, 25, anchor_y='top')
+        self.labels = (
+            Label(25, win_height - 75, CFG.UI.HEADER_COLOR, 40, 'Player Registration'),
+            self.msg_label,
+            self.summary_label,
+            Label(200, 40, CFG.UI.HEADER_COLOR, 20,
+                  'After registering, press FLAP to change player name. ESCAPE at any time to exit game.'),
+        )
+        self.msg = '...'
+        self.update_summary()
+
+    @property
+    def msg(self) -> str:
+        return self.msg_label.text
+
+    @msg.setter
+    def msg(self, msg: str) -> None:
+        self.msg_label.text = msg
+
+    def update_summary(self) -> None:
+        """Call when the registered players or their input change, to rebuild the text listing them"""
+        self.summary_label.text = self.get_summary()
+
     @staticmethod
     def _get_flap_event(evt: Optional[event.Event], player_entries):
         if evt is not None:
@@ -48,10 +77,8 @@ class Registration:
     @staticmethod
     def _get_device_locked_event(evt: Optional[event.Event], cur_joy) -> Optional[event.Event]:
         """Used by scriptutil.wait_until_non_none() to block until a key locked to current input device has been pressed"""
-        skippable_event_ids = [event.KeyPress(k).get_id() for k in (arcade.key.ENTER, arcade.key.F5, arcade.key.ESCAPE)]
-
         if evt is not None:
-            if evt.get_id() in skippable_event_ids:
+            if evt.get_id() in Registration.SKIPPABLE_EVENT_IDS:
                 return None
 
             if cur_joy is None:
@@ -70,13 +97,15 @@ class Registration:
                     return None
         return None
 
-    def registration_script(self) -> Iterator[None]:
+    def registration_script(self) -> scriptutl.GenScript:
         """Generator-script that creates players and registers their input"""
+        # saved players refer to gamepads by their index, so they can't be loaded until the gamepads are found
+        yield from scriptutl.wait_until(lambda: self.game.joysticks is not None, self.game.controllers_found)
         self.load_players()
 
         while True:
             self.msg = f'Press your desired FLAP to register Player {len(self.entries)+1}...\n\"Enter\" to start game. F5 to remove bottom player.'
-            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_flap_event(self.last_input, self.entries))  # type: ignore
+            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_flap_event(self.last_input, self.entries), self.input_arrived)  # type: ignore
 
             # exit game
             if evt.get_id() == event.KeyPress(arcade.key.ESCAPE).get_id():
@@ -87,6 +116,7 @@ class Registration:
                 self.last_input = None
                 if len(self.entries) > 0:
                     self.entries.pop()
+                    self.update_summary()
                 continue
 
             # end registration
@@ -101,37 +131,39 @@ class Registration:
             entry = _RegistrationEntry()
             self.entries.append(entry)
             entry.flap = evt
+            self.update_summary()
             flap_joy = None
             if isinstance(evt, event.JoyButtonPress):
                 flap_joy = evt.joy
             self.last_input = None
             self.msg = f'Press LEFT for Player {len(self.entries)}'
-            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_device_locked_event(self.last_input, flap_joy))
+            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_device_locked_event(self.last_input, flap_joy), self.input_arrived)
 
             if isinstance(evt, event.JoyHatMotion):
                 entry.left = evt
                 entry.right = evt
+                self.update_summary()
                 self.last_input = None
                 continue
 
             entry.left = evt
+            self.update_summary()
             self.last_input = None
             self.msg = f'Press RIGHT for Player {len(self.entries)}'
-            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_device_locked_event(self.last_input, flap_joy))
+            evt = yield from scriptutl.wait_until_non_none(lambda: self._get_device_locked_event(self.last_input, flap_joy), self.input_arrived)
 
             entry.right = evt
+            self.update_summary()
             self.last_input = None
 
         self.finalize()
         self.done = True
+        self.completed.fire()
 
     def on_draw(self) -> None:
-        arcade.draw_text('Player Registration', 25, self.win_height - 75, CFG.UI.HEADER_COLOR, 40)
-        arcade.draw_text(self.msg, 25, self.win_height - 175, CFG.UI.HEADER_COLOR, 30)
-        summary = self.get_summary()
-        arcade.draw_text(summary, 25, self.win_height - 200, CFG.UI.BODY_COLOR, 25, anchor_y='top')
-        msg = 'After registering, press FLAP to change player name. ESCAPE at any time to exit game.'
-        arcade.draw_text(msg, 200, 40, CFG.UI.HEADER_COLOR, 20)
+        # msg and update_summary() set the text, so the labels are only re-rendered when it changes
+        for label in self.labels:
+            label.draw()
 
     def on_event(self, evt: event.Event) -> None:
         matched = False
@@ -140,8 +172,10 @@ class Registration:
                 matched = True
                 if evt.get_id() == entry.flap.get_id():
                     entry.make_name()
+                    self.update_summary()
         if not matched:
             self.last_input = evt
+            self.input_arrived.fire(evt)
 
     def get_summary(self) -> str:
         summaries = [e.get_summary() for e in self.entries]
@@ -158,6 +192,7 @@ class Registration:
         def get_persistent_id(obj) -> Optional[int]:
             """Pickle pyglet's Joystick object by simply saving index into list"""
             if isinstance(obj, pyglet.input.base.Joystick):
+                assert self.game.joysticks is not None  # a player can only have a joystick once they are found
                 joy_idx = self.game.joysticks.index(obj)
                 print('  Pickling joystick idx #{} {}'.format(joy_idx, obj.device))
                 return joy_idx
@@ -174,6 +209,7 @@ class Registration:
             """Unpickle pyglet's Joystick object by using index to lookup joystick in list"""
             print('  Unpickling object using persistent_id:', persist_id)
             joystick_idx = persist_id
+            assert self.game.joysticks is not None  # registration_script() waits for them before loading
             joy = self.game.joysticks[joystick_idx]
             print('  Unpickling joystick:', joy.device)
             return joy
@@ -192,6 +228,24 @@ class Registration:
             print('WARNING: Problem loading previous player list from file:"{}" so starting with an empty player list. Exception: {} {}'.format(CFG.Player.filename, type(exc), str(exc)))
             self.entries = []
             traceback.print_exc()
+        self.update_summary()
+
+
+@functools.lru_cache(maxsize=None)
+def _key_names() -> Dict[int, str]:
+    """arcade.key constant -> its name. Built on first use, as it inspects the whole module."""
+    key_constants = [(name, value) for name, value in inspect.getmembers(arcade.key) if not name.startswith('__') and not name.startswith("MOTION")]
+    return {key_id: key_name for key_name, key_id in key_constants}
+
+
+def _describe_input(evt: Optional[event.Event]) -> str:
+    if evt is None:
+        return ""
+    if isinstance(evt, event.JoyButtonPress):
+        return f'#{evt.button}'
+    if isinstance(evt, event.KeyPress) and not str(evt).isascii():
+        return _key_names()[evt.key]
+    return str(evt)
 
 
 class _RegistrationEntry:
@@ -219,70 +273,32 @@ class _RegistrationEntry:
 
     def get_summary(self) -> str:
         """Return a string representing the player"""
-        key_constants = [(name, value) for name, value in inspect.getmembers(arcade.key) if not name.startswith('__') and not name.startswith("MOTION")]
-        key_name_lookup = {}
-        for key_name, key_id in key_constants:
-            key_name_lookup[key_id] = key_name
-
         device = ''
-        if self.flap is None:
-            flap = ""
-        else:
-            if isinstance(self.flap, event.JoyButtonPress):
-                flap = f'#{self.flap.button}'
-            elif not str(self.flap).isascii():
-                flap = key_name_lookup[self.flap.key]
-            else:
-                flap = str(self.flap)
-
-            if isinstance(self.flap, event.JoyButtonPress):
-                device = self.flap.joy.device.name.strip()
-            elif isinstance(self.flap, event.KeyPress):
-                device = 'keyboard'
-
-        if self.left is None:
-            left = ""
-        else:
-            if isinstance(self.left, event.JoyButtonPress):
-                left = f'#{self.left.button}'
-            elif not str(self.left).isascii():
-                left = key_name_lookup[self.left.key]
-            else:
-                left = str(self.left)
-
-        if self.right is None:
-            right = ""
-        else:
-            if isinstance(self.right, event.JoyButtonPress):
-                right = f'#{self.right.button}'
-            elif not str(self.right).isascii():
-                right = key_name_lookup[self.right.key]
-            else:
-                right = str(self.right)
-
-        summary = f'{self.name} {flap} / {left} / {right} ({device})\n'
+        if isinstance(self.flap, event.JoyButtonPress):
+            device = self.flap.joy.device.name.strip()
+        elif isinstance(self.flap, event.KeyPress):
+            device = 'keyboard'
+        summary = f'{self.name} {_describe_input(self.flap)} / {_describe_input(self.left)} / {_describe_input(self.right)} ({device})\n'
         return summary
 
     def finalize(self, game: 'Game') -> None:
         """Create Player objects and input handling dict when registration is complete"""
-        player_avatar = CFG.Registration.avatars[self.name]
-        img = 'resources/img/' + player_avatar.image
-        player = Player(img, self.name, player_avatar.color, game)
-        game.player_list.append(player)
+        player = game.sim.add_player(self.name)
 
         # flap
-        game.gameplay_input[self.flap.get_id()] = player.on_up
+        joysticks = game.joysticks
+        game.gameplay_input[self.flap.get_input_id(joysticks)] = player.on_up
 
         if isinstance(self.left, event.JoyHatMotion):
             # left & right with joyhat
-            game.gameplay_input[self.left.get_id()] = player.on_joyhat
-            game.gameplay_input[self.right.get_id()] = player.on_joyhat
+            game.gameplay_input[self.left.get_input_id(joysticks)] = player.on_joyhat
+            game.gameplay_input[self.right.get_input_id(joysticks)] = player.on_joyhat
         else:
             # left
-            game.gameplay_input[self.left.get_id()] = player.on_left
-            left_release_event_id = self.left.make_release().get_id()
-            game.gameplay_input[left_release_event_id] = player.on_left_release
+            game.gameplay_input[self.left.get_input_id(joysticks)] = player.on_left
+            left_release_input_id = self.left.make_release().get_input_id(joysticks)
+            game.gameplay_input[left_release_input_id] = player.on_left_release
             # right
-            game.gameplay_input[self.right.get_id()] = player.on_right
-            right_release_event_id = self.right.make_release().get_id()
-            game.gameplay_input[right_release_event_id] = player.on_right_release
+            game.gameplay_input[self.right.get_input_id(joysticks)] = player.on_right
+            right_release_input_id = self.right.make_release().get_input_id(joysticks)
+            game.gameplay_input[right_release_input_id] = player.on_right_release
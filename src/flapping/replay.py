@@ -0,0 +1,156 @@
+"""
+Records the input of a match to a compact binary log, and replays that log without a window.
+
+A match is deterministic given its random seed, the game clock's time when it starts and the input applied on
+each tick (see Simulation.match_script), so the log only holds those and the players. The start time matters as
+the match's sleeps sum float seconds: the same 1.0s sleep can take a different number of ticks from a different
+start time, and the welcome and registration screens leave the clock at whatever time they took.
+
+Replay the last recorded match as fast as possible with:
+
+    python -m flapping.replay [replay_file]
+"""
+import os
+import os.path
+import struct
+import sys
+import time
+from typing import BinaryIO, Callable, List, NamedTuple
+
+import pyglet
+pyglet.options['shadow_window'] = False  # so replays run with no display (see flapping.simulation)
+from flapping import flapping_cfg as CFG
+from flapping.simulation import Simulation
+
+
+MAGIC = b'FLAPREC2'
+_HEADER = struct.Struct('<dIIHHB')  # game clock time at the start, seed, goal score, width, height, player count
+_RECORD = struct.Struct('<IBBbb')  # tick, player index, action index, hat x, hat y
+
+# Player methods that input is mapped to (see Registration). Records store an index into this tuple.
+ACTIONS = ('on_up', 'on_left', 'on_left_release', 'on_right', 'on_right_release', 'on_joyhat')
+# special "player index" values
+CONTINUE = 254  # input that leaves the scoreboard
+END = 255  # written when the recording is closed
+
+
+class Record(NamedTuple):
+    tick: int
+    player_idx: int
+    action_idx: int
+    hatx: int
+    haty: int
+
+
+class Replay(NamedTuple):
+    start_time: float
+    seed: int
+    goal_score: int
+    width: int
+    height: int
+    player_names: List[str]
+    records: List[Record]
+
+
+class Recorder:
+    """Writes the gameplay input of a match, tagged with the tick it arrived on, to a binary log file"""
+    def __init__(self, filename: str, sim: Simulation, seed: int):
+        self.sim = sim
+        self._start_tick = sim.tick_count
+        self._player_idx = {p: idx for idx, p in enumerate(sim.player_list)}
+        self._file: BinaryIO = open(filename, 'wb')
+        print('Recording match input to {}'.format(filename))
+        self._file.write(MAGIC)
+        self._file.write(_HEADER.pack(sim.clock(), seed, CFG.Game.goal_score, sim.width, sim.height, len(sim.player_list)))
+        for p in sim.player_list:
+            name = p.name.encode()
+            self._file.write(bytes([len(name)]) + name)
+
+    def _write(self, player_idx: int, action_idx: int, hatx: int = 0, haty: int = 0) -> None:
+        self._file.write(_RECORD.pack(self.sim.tick_count - self._start_tick, player_idx, action_idx, hatx, haty))
+
+    def record(self, action: Callable, *args) -> None:
+        """Record a call to one of the Player input methods that are the values of Game.gameplay_input"""
+        player = getattr(action, '__self__', None)
+        if player not in self._player_idx:
+            return  # not a Player action (ex: ESCAPE to exit)
+        hatx, haty = args if args else (0, 0)
+        self._write(self._player_idx[player], ACTIONS.index(action.__name__), hatx, haty)
+
+    def record_continue(self) -> None:
+        self._write(CONTINUE, 0)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._write(END, 0)
+            self._file.close()
+
+
+def load(filename: str) -> Replay:
+    with open(filename, 'rb') as in_file:
+        data = in_file.read()
+    if not data.startswith(MAGIC):
+        if data.startswith(MAGIC[:-1]):
+            raise ValueError(f'{filename} was recorded in another version of the replay format')
+        raise ValueError(f'{filename} is not a replay file')
+    offset = len(MAGIC)
+    start_time, seed, goal_score, width, height, player_count = _HEADER.unpack_from(data, offset)
+    offset += _HEADER.size
+    names = []
+    for _ in range(player_count):
+        name_len = data[offset]
+        names.append(data[offset + 1:offset + 1 + name_len].decode())
+        offset += 1 + name_len
+    # a log that wasn't closed (ex: the game crashed) can end with a partial record
+    record_count = (len(data) - offset) // _RECORD.size
+    records = [Record(*rec) for rec in _RECORD.iter_unpack(data[offset:offset + record_count * _RECORD.size])]
+    return Replay(start_time, seed, goal_score, width, height, names, records)
+
+
+def play(replay: Replay, delta_time: float = 1 / CFG.Game.tick_rate) -> Simulation:
+    """Play back a recorded match without a window, as fast as possible. Returns the Simulation at the end."""
+    CFG.Game.goal_score = replay.goal_score
+    sim = Simulation(replay.width, replay.height)
+    sim.clock.advance(replay.start_time)  # exactly the recorded time, as the clock starts at 0
+    for name in replay.player_names:
+        sim.add_player(name)
+
+    script = sim.match_script(replay.seed)
+    next(script)
+    end_tick = replay.records[-1].tick if replay.records else 0
+    rec_idx = 0
+    for tick in range(end_tick + 1):
+        while rec_idx < len(replay.records) and replay.records[rec_idx].tick == tick:
+            rec = replay.records[rec_idx]
+            rec_idx += 1
+            if rec.player_idx == CONTINUE:
+                sim.scoreboard_sub_state = 'done'
+            elif rec.player_idx != END:
+                action = getattr(sim.player_list[rec.player_idx], ACTIONS[rec.action_idx])
+                if action.__name__ == 'on_joyhat':
+                    action(rec.hatx, rec.haty)
+                else:
+                    action()
+        if tick < end_tick:
+            sim.update(delta_time)
+            next(script)
+    return sim
+
+
+def main() -> None:
+    filename = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # resources are loaded relative to the package
+    if filename is None:
+        filename = CFG.Game.replay_filename
+    replay = load(filename)
+    print(f'Replaying {filename}: {len(replay.player_names)} players, {len(replay.records)} input records')
+    start = time.perf_counter()
+    sim = play(replay)
+    elapsed = time.perf_counter() - start
+    print(f'Replayed {sim.tick_count} ticks in {elapsed:.2f}s ({sim.tick_count / max(elapsed, 1e-9):.0f} ticks/s)')
+    print(f'Round {sim.round_num} of {CFG.Game.rounds}')
+    sim.print_scores()
+
+
+if __name__ == "__main__":
+    main()
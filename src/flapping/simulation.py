@@ -0,0 +1,302 @@
+"""Game rules of the Flapping game, independent of any window or display"""
+import random
+from typing import Dict, List, Optional
+
+import pyglet
+# pyglet opens a hidden "shadow" window when arcade imports it, which fails with no display. Nothing here draws,
+# so it isn't needed. Only has an effect if arcade hasn't been imported yet (it has, in the game).
+pyglet.options['shadow_window'] = False
+import arcade
+
+from gnp.arcadelib.clock import GameClock
+from gnp.arcadelib.timers import Timers
+from gnp.arcadelib.actor import ActorList, GrowthCheck
+from gnp.arcadelib.particles import ParticlePool
+from gnp.arcadelib.profiler import FrameProfiler
+from gnp.arcadelib import scriptutl
+from flapping import avatars
+from flapping import flapping_cfg as CFG
+from flapping import collision
+from flapping.maps import MapCache
+from flapping.player import Player
+from flapping.physics import VectorPhysics
+
+
+class Simulation:
+    """Owns the players, map and rules of a match: physics, collision, scoring and the round loop.
+
+    Nothing here draws or reads input, so a match can be stepped without opening a window and as fast as the
+    CPU allows (see run()). flap_app.Game wraps a Simulation and adds drawing and input on top of it."""
+    # game states
+    WELCOME = 'welcome'
+    REGISTRATION = 'registration'
+    PLAY = 'gameplay'
+    SCOREBOARD = 'scoreboard'
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.state: Optional[str] = None
+        self.scoreboard_sub_state: Optional[str] = None
+        self.auto_continue = False  # don't wait for input to leave the scoreboard (ex: when running headless)
+        self.tick_count = 0  # number of update() calls so far
+        # Simulated time. Advanced only by update(), so timers and scripts stay in step with ticks however fast
+        # the ticks are run. Pause and time scale are applied by whatever decides how many ticks to run.
+        self.clock = GameClock()
+
+        self.round_num = 0
+        self.winners: List[Player] = []
+        self.max_score = 0  # highest score of any player, kept up to date by on_score_changed()
+        self.score_changed = scriptutl.Signal()  # fired with the Player whose score changed
+
+        self.player_list = arcade.SpriteList()
+        self.active_players = arcade.SpriteList()  # players that are alive (updated, collided and drawn)
+        self.maps = MapCache()
+        self.fx_actors = ActorList()
+        self.death_particles = ParticlePool(CFG.FX.max_particles, 20, arcade.color.WHITE)
+        self.dust_particles = ParticlePool(CFG.FX.max_particles, 20, arcade.color.GRAY)
+        self.particle_pools = (self.death_particles, self.dust_particles)
+        self.physics = VectorPhysics() if CFG.Game.vector_physics else None
+        self.timers: Timers = Timers(self.clock)
+        self.script_sched: scriptutl.Scheduler = scriptutl.Scheduler(self.clock)
+        self.profiler = FrameProfiler(CFG.Profiler.frames, enabled=CFG.Profiler.enabled)  # frames end in on_draw
+        self.growth_check = GrowthCheck(CFG.Game.leak_check_rounds) if CFG.Game.leak_check_rounds else None
+
+    def add_player(self, name: str) -> Player:
+        """Create a Player that uses the avatar registered under the given name (see CFG.Registration.avatars)"""
+        player_avatar = CFG.Registration.avatars[name]
+        player = Player(avatars.img_path(player_avatar), name, player_avatar.color, self)
+        self.player_list.append(player)
+        return player
+
+    def setup(self, map_name):
+        # map
+        self.walls, self.killers, self.tile_grid = self.maps.get(map_name)
+
+        # players. The same active_players list is kept across rounds: each SpriteList a Player is in is also
+        # listed in Player.sprite_lists, so replacing the list would leave the old ones there.
+        for p in list(self.active_players):
+            self.active_players.remove(p)
+        x = 100
+        for p in self.player_list:
+            if p.is_alive:
+                self.active_players.append(p)
+            p.setup()
+            p.center_x = x
+            p.center_y = 120
+            p.change_x = 0.0
+            p.change_y = 0.0
+            p.score = 0
+            x += 100
+
+    def setup_new_round(self):
+        for p in self.player_list:
+            p.round_wins = 0
+
+    def on_score_changed(self, player: Player, old_score: int) -> None:
+        if player.score >= self.max_score:
+            self.max_score = player.score
+        elif old_score == self.max_score:
+            # the leader lost points, so someone else may lead now
+            self.max_score = max(p.score for p in self.player_list)
+        self.score_changed.fire(player)
+
+    def on_round_end(self):
+        # reward players with the max score
+        for p in self.player_list:
+            if p.score == self.max_score:
+                p.round_wins += 1
+                print(f'{p.name} wins round with {p.score} points. Has now won {p.round_wins} rounds.')
+
+        max_round_wins = max([p.round_wins for p in self.player_list])
+        self.winners = [p for p in self.player_list if p.round_wins == max_round_wins]
+
+    def live_counts(self) -> Dict[str, int]:
+        """Number of live FX Actors by type, scripts, timers and SpriteLists that the players are in"""
+        counts = dict(self.fx_actors.count_by_type())
+        counts['scripts'] = len(self.script_sched)
+        counts['timers'] = len(self.timers)
+        counts['player sprite_lists'] = sum(len(p.sprite_lists) for p in self.player_list)
+        return counts
+
+    def check_growth(self) -> None:
+        """Debug check for leaks (see CFG.Game.leak_check_rounds). Run at the same point of every round."""
+        if self.growth_check:
+            growing = self.growth_check.sample(self.live_counts())
+            assert not growing, f'Counts grew in each of the last {self.growth_check.samples} rounds: {growing}'
+
+    def match_script(self, seed: Optional[int] = None) -> scriptutl.GenScript:
+        """Generator-based "script" that plays rounds over the configured maps, forever
+
+        Given the same `seed` and the same input on the same ticks, a match plays out exactly the same way."""
+        if seed is not None:
+            random.seed(seed)
+        while True:
+            self.setup_new_round()
+            for round_idx in range(CFG.Game.rounds):
+                self.round_num = round_idx + 1
+                self.setup(CFG.Game.maps[round_idx % len(CFG.Game.maps)])
+                self.check_growth()
+                self.state = Simulation.PLAY
+                yield from scriptutl.wait_until(self.is_game_over, self.score_changed)
+                self.on_round_end()
+                yield from scriptutl.sleep(1.0, self.clock)  # give player a chance to see the effects of their action (and let FX play)
+                self.fx_actors.clear()
+                for pool in self.particle_pools:
+                    pool.kill()
+
+                self.state = Simulation.SCOREBOARD
+                # load the next round's map while the scoreboard is up, so the next round starts without a stall
+                self.maps.prefetch(CFG.Game.maps[(round_idx + 1) % len(CFG.Game.maps)])
+                # blackout input briefly so that any final, furious button mashing doesn't unintentionally skip the scoreboard
+                self.scoreboard_sub_state = 'blackout'
+                yield from scriptutl.sleep(1.0, self.clock)
+                self.scoreboard_sub_state = 'ready'
+                yield from scriptutl.wait_until(lambda: self.auto_continue or self.scoreboard_sub_state == 'done')
+
+    def update(self, delta_time: float) -> None:
+        prof = self.profiler
+        prof.start()
+        self.tick_count += 1
+        self.clock.advance(delta_time)
+        self.timers.update()
+        prof.lap('timers')
+        self.script_sched.update()
+        prof.lap('scripts')
+        self.fx_actors.update(delta_time)
+        for pool in self.particle_pools:
+            pool.update(delta_time)
+        prof.lap('fx update')
+        if self.state == Simulation.PLAY:
+            # Players killed during this update are removed from self.active_players, so work from a snapshot
+            players = list(self.active_players)
+            if self.physics:
+                self.physics.update(players)
+            else:
+                for player in players:
+                    player.update()
+
+                # Prevent partial-pixel positioning, which can cause edge artifacts on player sprites.
+                # This also makes it a bit easier for a player to completely stop the motion of their Player.
+                for player in players:
+                    player.center_x = int(player.center_x)
+                    player.center_y = int(player.center_y)
+            prof.lap('player physics')
+
+            for p in players:
+                hit_wall_list, hit_killer_list = self.tile_grid.check_for_collision(p, p.last_position)
+                self.check_killer_tiles_collision(p, hit_killer_list)
+                if not p.is_alive:
+                    hit_wall_list = []  # player just died, so it no longer collides with walls
+                self.check_wall_tiles_collision(p, hit_wall_list)
+            prof.lap('tile collision')
+            if self.physics:
+                self.physics.apply_gravity_and_wrap(players, self.width)
+            else:
+                for p in players:
+                    p.change_y -= CFG.Player.gravity
+                    if p.center_x < 0:
+                        p.center_x = self.width
+                    elif p.center_x > self.width:
+                        p.center_x = 0
+            prof.lap('player physics')
+            self.check_player_collision(players)
+            prof.lap('player collision')
+
+    def run(self, ticks: int, delta_time: float = 1 / CFG.Game.tick_rate) -> None:
+        """Play the match without a display for the given number of ticks, as fast as possible"""
+        self.auto_continue = True
+        script = self.match_script()
+        for _ in range(ticks):
+            self.update(delta_time)
+            next(script)
+
+    def emit_player_death_particles(self, player):
+        self.death_particles.burst(
+            player.center_x, player.center_y,
+            count=15,
+            speed=5.0,
+            lifetime_min=0.1,
+            lifetime_max=0.2,
+        )
+
+    def check_killer_tiles_collision(self, player: Player, hit_killer_list):
+        if len(hit_killer_list) > 0:
+            player.score += CFG.Player.death_score
+            self.emit_player_death_particles(player)
+            self.script_sched.add(player.death_script())
+
+    def check_wall_tiles_collision(self, player: Player, hit_wall_list):
+        # Swept test first, so a player that moved further than a wall is thick in one step can't pass through it.
+        # The player is moved back to where it first touched a wall, on both axes (the rest of the move could
+        # pass through another wall), leaving 1 pixel of overlap in the direction of the hit so the static
+        # resolution below treats it as a regular collision. Its speed into the wall is dropped.
+        first_sweep = None
+        for wall in hit_wall_list:
+            sweep = collision.sweep_AABB(player, player.last_position, wall)
+            if sweep is not None and (first_sweep is None or sweep.time < first_sweep.time):
+                first_sweep = sweep
+        if first_sweep is not None:
+            player.center_x = first_sweep.pos[0] - first_sweep.normal[0]
+            player.center_y = first_sweep.pos[1] - first_sweep.normal[1]
+            if first_sweep.normal[0] != 0:
+                player.change_x = 0
+            else:
+                player.change_y = 0
+
+        touching = False
+        for wall in hit_wall_list:
+            hit = collision.intersect_AABB(player, wall)
+            if hit is None:
+                continue
+            touching = True
+            if hit.normal[0] > 0 or hit.normal[0] < 0:  # from right or left
+                player.center_x += hit.delta[0]
+                player.change_x = 0
+            if hit.normal[1] > 0:  # hit top of wall
+                player.bottom = wall.top - 1
+                player.change_y = 0
+                player.set_landed()
+            if hit.normal[1] < 0:  # hit bottom of wall
+                player.center_y += hit.delta[1]
+                player.change_y = -3.0
+        if not touching:
+            player.set_flying()
+
+    def check_player_collision(self, players) -> None:
+        for idx1, idx2 in collision.sweep_and_prune(players):
+            p1: Player = players[idx1]
+            p2: Player = players[idx2]
+            if p1.is_alive and p2.is_alive:
+                if arcade.check_for_collision(p1, p2):
+                    if int(p1.center_y) == int(p2.center_y):
+                        # equal collision
+                        if p1.center_x < p2.center_x:
+                            p1.center_x += -1
+                            p1.change_x = -0.5
+                            p1.change_y = 0.0
+                            p2.center_x += 1
+                            p2.change_x = 0.5
+                            p2.change_y = 0.0
+                        else:
+                            p1.center_x += 1
+                            p1.change_x = 0.5
+                            p1.change_y = 0.0
+                            p2.center_x += -1
+                            p2.change_x = -0.5
+                            p2.change_y = 0.0
+                    elif p1.center_y > p2.center_y:
+                        p1.score += CFG.Player.kill_score
+                        self.emit_player_death_particles(p2)
+                        self.script_sched.add(p2.death_script())
+                    elif p2.center_y > p1.center_y:
+                        p2.score += CFG.Player.kill_score
+                        self.emit_player_death_particles(p1)
+                        self.script_sched.add(p1.death_script())
+
+    def print_scores(self):
+        for p in self.player_list:
+            print('{}: {}'.format(p.name, p.score))
+
+    def is_game_over(self):
+        return self.max_score >= CFG.Game.goal_score
@@ -0,0 +1,89 @@
+"""
+Startup benchmark: how long the game takes to import and to draw its first frame. Opens a window.
+
+    python -m flapping.startup [--runs 5] [--budget 1.0] [--output results.json]
+
+Each run launches the game in a new process, so nothing is already imported or cached. The time to the first
+frame is from the start of the imports to the end of the first on_draw(). Results are printed as JSON, and the
+exit code is 1 if the median time to the first frame is over --budget seconds, so a CI job can fail on it.
+
+Only the standard library is imported at the top of this module, so the game's own imports are what is timed.
+"""
+import argparse
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+import time
+
+_RESULT_PREFIX = 'STARTUP '  # marks the child's result among whatever else the game prints
+
+
+def _launch() -> None:
+    """Run in the child process: start the game, report the timings of the first frame and quit"""
+    start = time.perf_counter()
+    import arcade
+    from flapping import flap_app
+    from flapping import flapping_cfg as CFG
+    imported = time.perf_counter()
+
+    class FirstFrameGame(flap_app.Game):
+        def on_draw(self):
+            super().on_draw()
+            if self.frames_drawn == 1:
+                drawn = time.perf_counter()
+                print(_RESULT_PREFIX + json.dumps({'import_s': imported - start, 'first_frame_s': drawn - start}))
+                sys.stdout.flush()
+
+        def update(self, delta_time):
+            if self.frames_drawn > 0:
+                self.close()  # not from on_draw(), as the window is still to be flipped then
+            else:
+                super().update(delta_time)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # as flap_app.main() does
+    FirstFrameGame(1280, 720, 'Flapping', CFG.Window.fullscreen)
+    arcade.run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='number of times to launch the game')
+    parser.add_argument('--budget', type=float, default=1.0, help='allowed median seconds to the first frame')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--launch', action='store_true', help=argparse.SUPPRESS)  # used for each run
+    args = parser.parse_args()
+    if args.launch:
+        _launch()
+        return
+
+    runs = []
+    for _ in range(args.runs):
+        launched = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-m', 'flapping.startup', '--launch'], stdout=subprocess.PIPE,
+                              universal_newlines=True, check=True)
+        result = [line for line in proc.stdout.splitlines() if line.startswith(_RESULT_PREFIX)][0]
+        run = json.loads(result[len(_RESULT_PREFIX):])
+        run['process_s'] = time.perf_counter() - launched  # including interpreter start up and shut down
+        runs.append(run)
+
+    report = {
+        'runs': runs,
+        'median_import_s': statistics.median(r['import_s'] for r in runs),
+        'median_first_frame_s': statistics.median(r['first_frame_s'] for r in runs),
+        'budget_s': args.budget,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            out_file.write(text + '\n')
+    if report['median_first_frame_s'] > args.budget:
+        print('OVER BUDGET: first frame took {:.3f}s (budget {:.3f}s)'.format(
+            report['median_first_frame_s'], args.budget), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Grid-based index of a map's tiles, used for fast player vs. tile collision checks"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import arcade
+import pytiled_parser
+
+from flapping.collision import Rect
+
+
+def merge_cells(cells: Sequence[bool], cols: int, rows: int, tile_width: float, tile_height: float) -> List[Rect]:
+    """Merge the occupied cells of a grid into a small set of non-overlapping rectangles.
+
+    Each row is first split into maximal horizontal runs, then runs with the same extent in consecutive rows
+    are stacked into one rectangle. Because a horizontal run is never split, any floor or ceiling surface is
+    covered by exactly one rectangle, so a player sliding along it can't catch on the seam between two tiles.
+
+    `cells` is a flat, row-major list where row 0 is the bottom row of the map."""
+    rects: List[Rect] = []
+    # (start_col, end_col) -> [first row, last row] of the rectangle being grown
+    open_runs: Dict[Tuple[int, int], List[int]] = {}
+    for row in range(rows + 1):
+        runs = set()
+        if row < rows:
+            base = row * cols
+            col = 0
+            while col < cols:
+                if cells[base + col]:
+                    start = col
+                    while col + 1 < cols and cells[base + col + 1]:
+                        col += 1
+                    runs.add((start, col))
+                col += 1
+
+        # close any rectangle that doesn't continue into this row
+        for run in list(open_runs):
+            if run not in runs:
+                first_row, last_row = open_runs.pop(run)
+                rects.append(Rect(
+                    run[0] * tile_width,
+                    first_row * tile_height,
+                    (run[1] - run[0] + 1) * tile_width,
+                    (last_row - first_row + 1) * tile_height))
+        for run in runs:
+            if run in open_runs:
+                open_runs[run][1] = row
+            else:
+                open_runs[run] = [row, row]
+    return rects
+
+
+def tile_cells(tiles: arcade.SpriteList, cols: int, rows: int, tile_width: float, tile_height: float) \
+        -> List[Optional[arcade.Sprite]]:
+    """Flat, row-major list of the tile in each cell of the grid (or None), where row 0 is the bottom row"""
+    cells: List[Optional[arcade.Sprite]] = [None] * (cols * rows)
+    for tile in tiles:
+        col = int(tile.center_x // tile_width)
+        row = int(tile.center_y // tile_height)
+        if 0 <= col < cols and 0 <= row < rows:
+            cells[row * cols + col] = tile
+    return cells
+
+
+class TileGrid:
+    """Indexes the wall and kill tiles of a map by grid cell.
+
+    The map is already a grid of fixed-size tiles, so a Sprite's bounding box maps directly to the handful of
+    cells it overlaps. This avoids sweeping over every tile Sprite in the map each time a collision is checked.
+    Wall tiles are merged into larger rectangles (see merge_cells) and it is those rectangles that are returned
+    as hits. Sprites are treated as AABB (see collision.intersect_AABB)."""
+    def __init__(self, cols: int, rows: int, tile_width: int, tile_height: int, wall_rects: List[Rect],
+                 killers: arcade.SpriteList):
+        self.cols = cols
+        self.rows = rows
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        # flat, row-major lists of cells. Row 0 is the bottom row of the map (matches Arcade's axes).
+        self._killers: List[Optional[arcade.Sprite]] = tile_cells(killers, cols, rows, tile_width, tile_height)
+        self.wall_rects = wall_rects
+        self._walls: List[Optional[Rect]] = [None] * (self.cols * self.rows)
+        for rect in self.wall_rects:
+            for row in range(int(rect.bottom // self.tile_height), int(rect.top // self.tile_height)):
+                for col in range(int(rect.left // self.tile_width), int(rect.right // self.tile_width)):
+                    self._walls[row * self.cols + col] = rect
+
+    @classmethod
+    def from_tile_map(cls, tile_map: pytiled_parser.objects.TileMap, walls: arcade.SpriteList,
+                      killers: arcade.SpriteList) -> 'TileGrid':
+        """Index the tiles of a parsed map, merging the wall tiles into rectangles"""
+        cols = tile_map.map_size.width
+        rows = tile_map.map_size.height
+        tile_width = tile_map.tile_size.width
+        tile_height = tile_map.tile_size.height
+        wall_cells = [tile is not None for tile in tile_cells(walls, cols, rows, tile_width, tile_height)]
+        wall_rects = merge_cells(wall_cells, cols, rows, tile_width, tile_height)
+        return cls(cols, rows, tile_width, tile_height, wall_rects, killers)
+
+    def _cell_range(self, left: float, right: float, bottom: float, top: float) -> Tuple[int, int, int, int]:
+        """Return (col_min, col_max, row_min, row_max) of the cells that the box strictly overlaps"""
+        # touching an edge of a cell isn't an overlap
+        col_min = max(int(left // self.tile_width), 0)
+        col_max = min(-int(-right // self.tile_width) - 1, self.cols - 1)
+        row_min = max(int(bottom // self.tile_height), 0)
+        row_max = min(-int(-top // self.tile_height) - 1, self.rows - 1)
+        return col_min, col_max, row_min, row_max
+
+    def check_for_collision(self, sprite: arcade.Sprite, start: Optional[Tuple[float, float]] = None) \
+            -> Tuple[List[Rect], List[arcade.Sprite]]:
+        """Return (wall rectangles, kill tiles) that overlap the given Sprite.
+
+        If the Sprite moved this step from the `start` position (2-tuple of its center), wall rectangles anywhere
+        along that move are returned too, so they can be used with collision.sweep_AABB()."""
+        half_width = sprite.width / 2
+        half_height = sprite.height / 2
+        left = sprite.center_x - half_width
+        right = sprite.center_x + half_width
+        bottom = sprite.center_y - half_height
+        top = sprite.center_y + half_height
+
+        killer_hits = []
+        col_min, col_max, row_min, row_max = self._cell_range(left, right, bottom, top)
+        for row in range(row_min, row_max + 1):
+            base = row * self.cols
+            for col in range(col_min, col_max + 1):
+                killer = self._killers[base + col]
+                if killer is not None:
+                    killer_hits.append(killer)
+
+        if start is not None:
+            left = min(left, start[0] - half_width)
+            right = max(right, start[0] + half_width)
+            bottom = min(bottom, start[1] - half_height)
+            top = max(top, start[1] + half_height)
+            col_min, col_max, row_min, row_max = self._cell_range(left, right, bottom, top)
+        wall_hits: List[Rect] = []
+        for row in range(row_min, row_max + 1):
+            base = row * self.cols
+            for col in range(col_min, col_max + 1):
+                wall = self._walls[base + col]
+                if wall is not None and wall not in wall_hits:
+                    wall_hits.append(wall)
+        return wall_hits, killer_hits
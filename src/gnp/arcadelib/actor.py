@@ -1,6 +1,10 @@
 """
 Interface that allows app code to manage a wide variety of dynamic game objects with one interface
 """
+import collections
+import inspect
+from typing import Any, Counter, Deque, Dict, Hashable, List, Mapping, Optional, Set, Type
+
 import arcade
 
 
@@ -28,31 +32,138 @@ class Actor:
 # monkey patch existing arcade classes to make them Actor-like
 arcade.Sprite.can_reap = lambda other_self: None
 arcade.SpriteList.can_reap = lambda other_self: None
-# monkey patch Emitter to handle Actor passing "delta_time" to update() method
-arcade.Emitter._original_update = arcade.Emitter.update
-arcade.Emitter.update = lambda other_self, delta_time: other_self._original_update()
+
+
+# type -> whether its update() takes a delta_time argument
+_takes_delta_time: Dict[type, bool] = {}
+
+
+def _update_takes_delta_time(actor_type: Type[Any]) -> bool:
+    """Some Actor-like arcade classes have an update() with no delta_time parameter (ex: Emitter, Sprite)"""
+    takes_delta_time = _takes_delta_time.get(actor_type)
+    if takes_delta_time is None:
+        # the method is looked up on the class (unbound), so "self" is one of the parameters
+        takes_delta_time = len(inspect.signature(actor_type.update).parameters) > 1
+        _takes_delta_time[actor_type] = takes_delta_time
+    return takes_delta_time
 
 
 class ActorList(list, Actor):
-    """ActorList is a container of Actors. An ActorList is-a Actor, so it can be easily assembled into hierarchies"""
+    """ActorList is a container of Actors. An ActorList is-a Actor, so it can be easily assembled into hierarchies
+
+    Reaping is done in one pass that keeps the surviving Actors in order, so it costs the same however many
+    Actors are reaped at once, rather than a list.remove() for each. Runs of Actors of the same type (ex: a list of
+    particle emitters) share one check of how their update() is called.
+
+    Actors can be added on behalf of an owner (ex: a Player's dust stream) with add_owned(). reset_owner() then
+    kills and removes them, so an owner that re-creates its Actors each time it is set up doesn't pile up old ones.
+    Owners must be hashable, and are held by the list until reset or cleared."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._owned: Dict[Hashable, List[Actor]] = {}  # owner -> Actors added for it with add_owned()
+
+    def add_owned(self, actor: Actor, owner: Hashable) -> None:
+        """Append an Actor that lives until `owner` is reset (see reset_owner()), if it isn't reaped before"""
+        self.append(actor)
+        self._owned.setdefault(owner, []).append(actor)
+
+    def reset_owner(self, owner: Hashable) -> None:
+        """Kill and remove the Actors added for `owner`"""
+        actors = self._owned.pop(owner, None)
+        if not actors:
+            return
+        owned_ids = set()
+        for actor in actors:
+            actor.kill()
+            owned_ids.add(id(actor))
+        self[:] = [actor for actor in self if id(actor) not in owned_ids]
+
+    def count_by_type(self, counts: Optional[Counter[str]] = None) -> Counter[str]:
+        """Number of Actors in the list by type name, including those in nested ActorLists"""
+        if counts is None:
+            counts = collections.Counter()
+        for actor in self:
+            if isinstance(actor, ActorList):
+                actor.count_by_type(counts)
+            else:
+                counts[type(actor).__name__] += 1
+        return counts
+
     def draw(self):
         for actor in self:
             actor.draw()
 
     def update(self, delta_time: float):
-        actors_to_delete = []
+        reaped_ids: Optional[Set[int]] = None  # ids, as an ActorList in the list isn't hashable
+        last_type = None
+        takes_delta_time = True
+        # Actors appended during the loop are updated too, as the loop runs to the current end of the list
         for actor in self:
-            actor.update(delta_time)
+            if type(actor) is not last_type:
+                last_type = type(actor)
+                takes_delta_time = _update_takes_delta_time(last_type)
+            if takes_delta_time:
+                actor.update(delta_time)
+            else:
+                actor.update()
             if actor.can_reap():
-                actors_to_delete.append(actor)
-        for actor_to_del in actors_to_delete:
-            self.remove(actor_to_del)
+                if reaped_ids is None:
+                    reaped_ids = set()
+                reaped_ids.add(id(actor))
+        if reaped_ids:
+            self[:] = [actor for actor in self if id(actor) not in reaped_ids]
+            if self._owned:
+                self._forget_owned(reaped_ids)
+
+    def _forget_owned(self, actor_ids: Set[int]) -> None:
+        for owner, actors in list(self._owned.items()):
+            actors = [actor for actor in actors if id(actor) not in actor_ids]
+            if actors:
+                self._owned[owner] = actors
+            else:
+                del self._owned[owner]
+
+    def clear(self):
+        super().clear()
+        self._owned.clear()
 
     def can_reap(self) -> bool:
-        return all([actor.can_reap() for actor in self])
+        return all(actor.can_reap() for actor in self)
 
     def kill(self):
         for actor in self:
             actor.kill()
         self.clear()
 
+
+class GrowthCheck:
+    """Flags counts that grow every time they are sampled, the usual sign of a leak in a long running game
+
+    Usage:
+        check = GrowthCheck(samples=3)
+        # at the same point in each round (ex: its end)
+        growing = check.sample(actors.count_by_type())
+        if growing:
+            ...  # report, or fail in debug builds
+
+    A count is flagged once it has grown in each of the last `samples` samples. Counts that go up and down with
+    gameplay (ex: the number of live particles) aren't flagged, however high they get."""
+    def __init__(self, samples: int = 3):
+        self.samples = samples
+        self._history: Dict[str, Deque[int]] = {}  # name -> last samples + 1 counts
+
+    def sample(self, counts: Mapping[str, int]) -> List[str]:
+        """Record the current counts. Returns the names of the counts that have been growing steadily."""
+        counts = dict(counts)
+        for name in self._history.keys() - counts.keys():
+            counts[name] = 0  # no longer reported, so dropped to nothing
+        growing = []
+        for name, count in counts.items():
+            history = self._history.get(name)
+            if history is None:
+                history = self._history[name] = collections.deque(maxlen=self.samples + 1)
+            history.append(count)
+            if len(history) == history.maxlen and all(a < b for a, b in zip(history, list(history)[1:])):
+                growing.append(name)
+        return growing
+
@@ -0,0 +1,57 @@
+"""
+Registry of assets (ex: textures) that are created the first time they are used, rather than at startup
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class AssetRegistry:
+    """Assets registered by key along with a function that creates them. Nothing is created until it is used.
+
+    Usage:
+        assets = AssetRegistry()
+        assets.register('dust', lambda: arcade.make_soft_circle_texture(20, arcade.color.GRAY))  # cheap
+        ...
+        texture = assets.get('dust')  # created here, on first use, then cached
+        assets.prewarm(['dust'])  # or create ahead of use, on a worker thread
+
+    Assets are created under a lock, so one is never created twice when a worker thread and the main thread both
+    ask for it. Creating an asset must not make OpenGL calls if it may be done by prewarm(), as those have to be
+    made on the main thread (arcade textures only upload to the GPU when first drawn, so they are fine)."""
+    def __init__(self):
+        self._factories: Dict[Hashable, Callable[[], Any]] = {}
+        self._assets: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: Hashable, factory: Callable[[], Any]) -> None:
+        """Register how to create an asset. Re-registering a key that was already created has no effect."""
+        self._factories.setdefault(key, factory)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._factories
+
+    def is_loaded(self, key: Hashable) -> bool:
+        return key in self._assets
+
+    def get(self, key: Hashable, factory: Optional[Callable[[], Any]] = None) -> Any:
+        """The asset, created now if this is its first use. `factory` registers the asset if it isn't yet."""
+        asset = self._assets.get(key)
+        if asset is None:
+            if factory is not None:
+                self.register(key, factory)
+            with self._lock:
+                asset = self._assets.get(key)
+                if asset is None:
+                    asset = self._assets[key] = self._factories[key]()
+        return asset
+
+    def prewarm(self, keys: Optional[Iterable[Hashable]] = None) -> threading.Thread:
+        """Create the given assets (default: all registered ones) on a worker thread, ahead of their use"""
+        keys = list(self._factories if keys is None else keys)
+
+        def create_all() -> None:
+            for key in keys:
+                self.get(key)
+        thread = threading.Thread(target=create_all, name='asset prewarm', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,72 @@
+"""
+Awaitables for writing game scripts as "async def" coroutines, run by a scriptutl.Scheduler
+
+Usage:
+    async def intro(clock):
+        show_title()
+        await asyncutl.sleep(2.0, clock)
+        name = await asyncutl.event('player_joined')  # value given to Scheduler.signal('player_joined', name)
+        await asyncutl.fired(some_signal)  # a scriptutl.Signal
+        await asyncutl.next_frame()
+
+    sched = Scheduler(clock)
+    sched.add(intro(clock))  # coroutines and generator scripts can share a Scheduler
+    sched.signal('player_joined', 'Ruby')
+
+The Scheduler is the frame-stepped event loop: each update() resumes only the coroutines whose awaitable has
+completed. The awaitables use the same yield markers as the scriptutl generators, so a coroutine suspended in
+sleep() or event() isn't touched until it is due or signaled. Awaiting asyncio futures or tasks isn't
+supported, as the Scheduler doesn't run an asyncio event loop.
+"""
+import time
+from typing import Any, Callable, Generator, Optional, TypeVar
+
+from gnp.arcadelib import scriptutl
+
+T = TypeVar("T")
+
+
+class ScriptAwaitable:
+    """Makes one of the scriptutl utility generators awaitable"""
+    __slots__ = ('_gen',)
+
+    def __init__(self, gen: Generator[Any, Any, Any]):
+        self._gen = gen
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        return self._gen
+
+
+def _one_frame() -> Generator[None, None, None]:
+    yield
+
+
+def next_frame() -> ScriptAwaitable:
+    """Resume on the next Scheduler update"""
+    return ScriptAwaitable(_one_frame())
+
+
+def sleep(delay: float, clock: Callable[[], float] = time.time) -> ScriptAwaitable:
+    """Resume once `delay` seconds have passed on the clock (which should be the Scheduler's clock)"""
+    return ScriptAwaitable(scriptutl.sleep(delay, clock))
+
+
+def event(name: str) -> ScriptAwaitable:
+    """Resume once the Scheduler is signaled with the named event. Evaluates to the signaled value."""
+    return ScriptAwaitable(scriptutl.wait_event(name))
+
+
+def fired(signal: scriptutl.Signal) -> ScriptAwaitable:
+    """Resume once the Signal fires. Evaluates to the value it was fired with."""
+    return ScriptAwaitable(scriptutl.wait_signal(signal))
+
+
+def wait_until(predicate: Callable[[], bool], changed: Optional[scriptutl.Signal] = None) -> ScriptAwaitable:
+    """Resume once the predicate is true. The predicate is checked every frame, or each time `changed` fires."""
+    return ScriptAwaitable(scriptutl.wait_until(predicate, changed))
+
+
+def wait_until_non_none(func: Callable[[], Optional[T]], changed: Optional[scriptutl.Signal] = None) \
+        -> ScriptAwaitable:
+    """Resume once func returns something other than None. Evaluates to that value."""
+    return ScriptAwaitable(scriptutl.wait_until_non_none(func, changed))
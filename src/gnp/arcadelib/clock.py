@@ -0,0 +1,55 @@
+"""
+Game clock that can be paused, sped up or slowed down, and stepped by hand
+"""
+
+
+class GameClock:
+    """Game time, in seconds, that the game's Timers and scripts all run on.
+
+    Usage:
+        clock = GameClock()
+        timers = Timers(clock)
+        sched = Scheduler(clock)
+        sched.add(script())  # where script does: yield from sleep(2.0, clock)
+
+        def update(self, delta_time):  # called once per frame with the real time elapsed
+            clock.tick(delta_time)
+            timers.update()
+            sched.update()
+
+    A GameClock is called to read the time (`clock()`), so it can be passed anywhere a clock function is
+    expected. Reading it is an attribute lookup, not a system call.
+
+    Real time is converted to game time by tick() (or to_game_time(), for a game loop that runs fixed-size
+    ticks and advances the clock itself), which applies `scale` and `paused`. advance() moves game time
+    forward directly, ignoring both, which is how a game without a display can fast-forward.
+    """
+    def __init__(self, scale: float = 1.0):
+        self.time = 0.0
+        self.scale = scale  # game seconds per real second. Ex: 2.0 runs the game twice as fast.
+        self.paused = False
+
+    def __call__(self) -> float:
+        return self.time
+
+    def to_game_time(self, real_delta_time: float) -> float:
+        """Convert an amount of real time to game time, given the current scale and whether the clock is paused"""
+        if self.paused:
+            return 0.0
+        return real_delta_time * self.scale
+
+    def tick(self, real_delta_time: float) -> float:
+        """Move the clock forward by the given amount of real time. Returns the amount of game time that passed."""
+        delta_time = self.to_game_time(real_delta_time)
+        self.time += delta_time
+        return delta_time
+
+    def advance(self, delta_time: float) -> None:
+        """Move the clock forward by the given amount of game time, even when paused"""
+        self.time += delta_time
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
@@ -0,0 +1,98 @@
+"""
+Queue of timestamped input events, applied at a fixed point in the game loop, and input latency statistics
+"""
+import time
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+
+class InputQueue:
+    """Fixed-size ring buffer of input events that arrive between ticks, to be applied at the start of the next one.
+
+    Usage:
+        queue = InputQueue()
+
+        def on_key_press(self, key, modifiers):  # as the event arrives
+            queue.push(key_id(key))
+
+        def tick(self, delta_time):
+            for input_id, x, y, arrival in queue.drain():
+                actions[input_id]()
+            simulate(delta_time)
+
+    An event is an integer id plus two small integers of data (ex: the x and y of a joystick hat) and the time it
+    arrived (time.perf_counter()). Events are kept in preallocated lists, so queueing one allocates nothing.
+    If the queue is full, new events are dropped and counted in `dropped_count`. Draining once per tick keeps it
+    far from full.
+    """
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.dropped_count = 0
+        self._ids = [0] * capacity
+        self._x = [0] * capacity
+        self._y = [0] * capacity
+        self._arrivals = [0.0] * capacity
+        self._head = 0  # index of the oldest event
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, input_id: int, x: int = 0, y: int = 0) -> None:
+        """Queue an event that has just arrived"""
+        if self._count == self.capacity:
+            self.dropped_count += 1
+            return
+        idx = (self._head + self._count) % self.capacity
+        self._ids[idx] = input_id
+        self._x[idx] = x
+        self._y[idx] = y
+        self._arrivals[idx] = time.perf_counter()
+        self._count += 1
+
+    def drain(self) -> Iterator[Tuple[int, int, int, float]]:
+        """Remove and yield (input id, x, y, arrival time) of each queued event, oldest first.
+
+        Events pushed while draining (ex: by an action) are yielded too."""
+        while self._count:
+            idx = self._head
+            self._head = (idx + 1) % self.capacity
+            self._count -= 1
+            yield self._ids[idx], self._x[idx], self._y[idx], self._arrivals[idx]
+
+    def clear(self) -> None:
+        self._head = 0
+        self._count = 0
+
+
+class LatencyLog:
+    """The last `capacity` latencies of something (ex: from an input arriving to its effect being on screen)"""
+    def __init__(self, name: str, capacity: int = 1000):
+        self.name = name
+        self.capacity = capacity
+        self.count = 0  # latencies recorded so far
+        self._samples = [0.0] * capacity  # seconds
+
+    def record(self, seconds: float) -> None:
+        self._samples[self.count % self.capacity] = seconds
+        self.count += 1
+
+    def record_since(self, start: float) -> None:
+        """Record the time from `start` (a time.perf_counter() value) until now"""
+        self.record(time.perf_counter() - start)
+
+    def summary(self) -> Dict:
+        """Statistics of the recorded latencies, in ms. Same fields as FrameProfiler.summary()."""
+        samples = np.array(self._samples[:min(self.count, self.capacity)]) * 1000
+        if len(samples) == 0:
+            return {'phase': self.name, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            'phase': self.name,
+            'mean_ms': round(float(samples.mean()), 4),
+            'p50_ms': round(float(p50), 4),
+            'p95_ms': round(float(p95), 4),
+            'p99_ms': round(float(p99), 4),
+            'max_ms': round(float(samples.max()), 4),
+        }
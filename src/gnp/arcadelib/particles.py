@@ -0,0 +1,197 @@
+"""
+Particle system that keeps its particles in preallocated NumPy arrays instead of one Python object per particle
+"""
+import math
+from typing import Optional
+
+import arcade
+import numpy as np
+
+from gnp.arcadelib.actor import Actor
+
+
+_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+uniform float diameter;
+
+in vec2 in_pos;
+in float in_alpha;
+
+out float v_alpha;
+
+void main() {
+    gl_Position = proj.matrix * vec4(in_pos, 0.0, 1.0);
+    gl_PointSize = diameter;
+    v_alpha = in_alpha;
+}
+"""
+
+_FRAGMENT_SHADER = """
+#version 330
+
+uniform vec3 color;
+
+in float v_alpha;
+
+out vec4 f_color;
+
+void main() {
+    // same falloff as arcade.make_soft_circle_texture(): opaque at the center, transparent at the edge
+    float dist = length(gl_PointCoord - vec2(0.5)) * 2.0;
+    if (dist > 1.0) {
+        discard;
+    }
+    f_color = vec4(color, (1.0 - dist) * v_alpha);
+}
+"""
+
+
+class ParticlePool(Actor):
+    """A fixed-capacity pool of soft, round particles that fade out over their lifetime.
+
+    All particles in a pool share a color and diameter. Their position, velocity, age, lifetime and alpha are
+    rows in NumPy arrays, so the whole pool is updated in a few vectorized operations and drawn in one batch
+    (a single draw call of point sprites). Live particles are kept packed at the front of the arrays. Emitting
+    when the pool is full drops the extra particles, so the cost of a frame is bounded by the capacity.
+
+    Like arcade's particles, velocity is in pixels per update."""
+    def __init__(self, capacity: int, diameter: float, color: arcade.arcade_types.Color,
+                 rng: Optional[np.random.Generator] = None):
+        self.capacity = capacity
+        self.diameter = diameter
+        self.color = color
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.count = 0  # number of live particles, which are rows [0, count) of the arrays
+        self.dropped_count = 0  # particles not emitted because the pool was full
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.ones(capacity, dtype=np.float32)
+        # vertex data for drawing: x, y, alpha (0.0-1.0)
+        self._vertices = np.zeros((capacity, 3), dtype=np.float32)
+        # GL resources are created on the first draw, as they need a window
+        self._program: Optional[arcade.gl.Program] = None
+        self._buffer: Optional[arcade.gl.Buffer] = None
+        self._geometry: Optional[arcade.gl.Geometry] = None
+
+    def _reserve(self, count: int) -> slice:
+        """Return the rows to write `count` new particles to (fewer, if the pool is nearly full)"""
+        start = self.count
+        end = min(start + count, self.capacity)
+        self.dropped_count += count - (end - start)
+        self.count = end
+        return slice(start, end)
+
+    def burst(self, x: float, y: float, count: int, speed: float, lifetime_min: float, lifetime_max: float) -> None:
+        """Emit particles from a point in random directions, with random speeds up to `speed`.
+        Same distribution as arcade.make_burst_emitter()."""
+        rows = self._reserve(count)
+        count = rows.stop - rows.start
+        angle = self.rng.uniform(0.0, 2 * math.pi, count)
+        magnitude = self.rng.uniform(0.0, speed, count)
+        self._init_particles(rows, x, y, angle, magnitude, lifetime_min, lifetime_max)
+
+    def spray(self, x: float, y: float, count: int, angle_deg: float, half_angle_spread_deg: float, speed: float,
+              lifetime_min: float, lifetime_max: float) -> None:
+        """Emit particles from a point at the given speed, in directions within a cone.
+        Same distribution as arcade.rand_vec_spread_deg()."""
+        rows = self._reserve(count)
+        count = rows.stop - rows.start
+        angle = np.radians(self.rng.uniform(angle_deg - half_angle_spread_deg, angle_deg + half_angle_spread_deg, count))
+        self._init_particles(rows, x, y, angle, np.full(count, speed), lifetime_min, lifetime_max)
+
+    def _init_particles(self, rows: slice, x: float, y: float, angle: np.ndarray, magnitude: np.ndarray,
+                        lifetime_min: float, lifetime_max: float) -> None:
+        self.pos[rows] = (x, y)
+        self.vel[rows, 0] = np.cos(angle) * magnitude
+        self.vel[rows, 1] = np.sin(angle) * magnitude
+        self.age[rows] = 0.0
+        self.lifetime[rows] = self.rng.uniform(lifetime_min, lifetime_max, len(angle))
+
+    def update(self, delta_time: float) -> None:
+        count = self.count
+        if count == 0:
+            return
+        self.pos[:count] += self.vel[:count]
+        self.age[:count] += delta_time
+        alive = self.age[:count] < self.lifetime[:count]
+        live_count = int(np.count_nonzero(alive))
+        if live_count < count:
+            # pack the survivors at the front of the arrays
+            for array in (self.pos, self.vel, self.age, self.lifetime):
+                array[:live_count] = array[:count][alive]
+            self.count = live_count
+
+    def draw(self) -> None:
+        count = self.count
+        if count == 0:
+            return
+        if self._geometry is None:
+            self._create_gl_resources()
+        assert self._program is not None and self._buffer is not None and self._geometry is not None
+        vertices = self._vertices[:count]
+        vertices[:, :2] = self.pos[:count]
+        # fade linearly from opaque to transparent over the lifetime, like arcade.FadeParticle
+        np.subtract(1.0, self.age[:count] / self.lifetime[:count], out=vertices[:, 2])
+        self._buffer.write(vertices)
+
+        ctx = arcade.get_window().ctx
+        ctx.enable(ctx.BLEND, ctx.PROGRAM_POINT_SIZE)
+        self._program['diameter'] = float(self.diameter)
+        self._program['color'] = tuple(c / 255 for c in self.color[:3])
+        self._geometry.render(self._program, mode=ctx.POINTS, vertices=count)
+        ctx.disable(ctx.PROGRAM_POINT_SIZE)
+
+    def _create_gl_resources(self) -> None:
+        ctx = arcade.get_window().ctx
+        self._program = ctx.program(vertex_shader=_VERTEX_SHADER, fragment_shader=_FRAGMENT_SHADER)
+        self._buffer = ctx.buffer(reserve=self._vertices.nbytes, usage='stream')
+        self._geometry = ctx.geometry([
+            arcade.gl.BufferDescription(self._buffer, '2f 1f', ['in_pos', 'in_alpha']),
+        ])
+
+    def can_reap(self) -> bool:
+        return False
+
+    def kill(self) -> None:
+        """Remove all particles"""
+        self.count = 0
+
+
+class ParticleStream(Actor):
+    """Sprays particles into a ParticlePool from a point that can be moved, at a rate set by `rate_factory`.
+
+    `rate_factory` is an arcade.EmitController (ex: arcade.EmitInterval, or one that can be started and stopped),
+    so the rate control works the same way as with an arcade.Emitter. The stream itself draws nothing; its
+    particles are drawn with the pool."""
+    def __init__(self, pool: ParticlePool, rate_factory: arcade.EmitController, angle_deg: float,
+                 half_angle_spread_deg: float, speed: float, lifetime_min: float, lifetime_max: float):
+        self.pool = pool
+        self.rate_factory = rate_factory
+        self.center_x = 0.0
+        self.center_y = 0.0
+        self.angle_deg = angle_deg
+        self.half_angle_spread_deg = half_angle_spread_deg
+        self.speed = speed
+        self.lifetime_min = lifetime_min
+        self.lifetime_max = lifetime_max
+        self._killed = False
+
+    def update(self, delta_time: float) -> None:
+        emit_count = self.rate_factory.how_many(delta_time, self.pool.count)
+        if emit_count > 0:
+            self.pool.spray(self.center_x, self.center_y, emit_count, self.angle_deg, self.half_angle_spread_deg,
+                            self.speed, self.lifetime_min, self.lifetime_max)
+
+    def draw(self) -> None:
+        pass
+
+    def can_reap(self) -> bool:
+        return self._killed or self.rate_factory.is_complete()
+
+    def kill(self) -> None:
+        self._killed = True
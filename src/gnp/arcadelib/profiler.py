@@ -0,0 +1,126 @@
+"""
+Frame profiler that times the phases of each frame (ex: physics, collision, drawing) into a ring buffer
+"""
+import csv
+import json
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class FrameProfiler:
+    """Times named phases of each frame and keeps the last `capacity` frames.
+
+    Usage:
+        prof = FrameProfiler()
+
+        def update(self, delta_time):
+            prof.start()
+            timers.update()
+            prof.lap('timers')
+            sched.update()
+            prof.lap('scripts')
+
+        def on_draw(self):
+            prof.start()
+            sprites.draw()
+            prof.lap('draw sprites')
+            prof.end_frame()
+
+    lap() charges the time since the last start() or lap() to the named phase, so each phase costs one call.
+    A phase that runs more than once in a frame (ex: on every tick of a frame that runs several) is summed.
+    Time outside of start() and lap() (ex: waiting for vsync) isn't counted.
+
+    When `enabled` is False, start(), lap() and end_frame() return right away, so the calls can stay in
+    production code. Phases are added as they are first seen, up to `max_phases`; the rest are ignored.
+    """
+    def __init__(self, capacity: int = 600, max_phases: int = 32, enabled: bool = False):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_phases = max_phases
+        self.phases: Dict[str, int] = {}  # name -> column of the ring buffer, in the order first seen
+        self.frame_count = 0  # frames recorded since the last clear()
+        self._frames = np.zeros((capacity, max_phases), dtype=np.float64)  # seconds, one row per frame
+        self._current = [0.0] * max_phases  # the frame being recorded
+        self._last = 0.0
+
+    def start(self) -> None:
+        """Start timing from now (ex: at the top of update() or on_draw())"""
+        if not self.enabled:
+            return
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Charge the time since the last start() or lap() to `phase`"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        column = self.phases.get(phase)
+        if column is None:
+            if len(self.phases) == self.max_phases:
+                self._last = now
+                return
+            column = self.phases[phase] = len(self.phases)
+        self._current[column] += now - self._last
+        self._last = now
+
+    def end_frame(self) -> None:
+        """Store the phase times of the frame in the ring buffer, and start a new frame"""
+        if not self.enabled:
+            return
+        self._frames[self.frame_count % self.capacity] = self._current
+        self._current = [0.0] * self.max_phases
+        self.frame_count += 1
+
+    def clear(self) -> None:
+        self.phases.clear()
+        self.frame_count = 0
+        self._current = [0.0] * self.max_phases
+
+    def frames(self) -> np.ndarray:
+        """Phase times (in seconds) of the recorded frames, oldest first. One row per frame, a column per phase."""
+        count = min(self.frame_count, self.capacity)
+        start = self.frame_count % self.capacity if self.frame_count > self.capacity else 0
+        rows = np.roll(self._frames[:count], -start, axis=0)
+        return rows[:, :len(self.phases)]
+
+    def summary(self) -> List[Dict]:
+        """Statistics of each phase, and of the whole frame ('total'), over the recorded frames. Times in ms."""
+        frames = self.frames() * 1000
+        if len(frames) == 0:
+            return []
+        names = list(self.phases) + ['total']
+        columns = np.column_stack([frames, frames.sum(axis=1)])
+        p50, p95, p99 = np.percentile(columns, [50, 95, 99], axis=0)
+        return [
+            {
+                'phase': name,
+                'mean_ms': round(float(columns[:, idx].mean()), 4),
+                'p50_ms': round(float(p50[idx]), 4),
+                'p95_ms': round(float(p95[idx]), 4),
+                'p99_ms': round(float(p99[idx]), 4),
+                'max_ms': round(float(columns[:, idx].max()), 4),
+            }
+            for idx, name in enumerate(names)
+        ]
+
+    def dump(self, filename: str, extra_summary: Sequence[Dict] = ()) -> None:
+        """Write the summary, as CSV if the filename ends in .csv and otherwise as JSON along with every frame.
+
+        extra_summary: more rows with the same fields to add to the summary (ex: LatencyLog.summary())"""
+        summary = self.summary() + list(extra_summary)
+        with open(filename, 'w', newline='') as out_file:
+            if filename.endswith('.csv'):
+                writer = csv.DictWriter(out_file, ['phase', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+                writer.writeheader()
+                writer.writerows(summary)
+            else:
+                report = {
+                    'frame_count': min(self.frame_count, self.capacity),
+                    'summary': summary,
+                    'phases': list(self.phases),
+                    'frames_ms': np.round(self.frames() * 1000, 4).tolist(),
+                }
+                json.dump(report, out_file, indent=2)
+                out_file.write('\n')
@@ -1,67 +1,190 @@
 """
 Utilities to help support the generator-based game script
 """
+import heapq
+import itertools
 import time
 
-from typing import Callable, List, Optional, TypeVar, Generator
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, TypeVar, Generator, Union
+
+
+class Sleep:
+    """Yielded by sleep() to tell the Scheduler running the script when it next needs to be stepped"""
+    __slots__ = ('wake_time', 'clock')
+
+    def __init__(self, wake_time: float, clock: Callable[[], float]):
+        self.wake_time = wake_time
+        self.clock = clock
+
+
+class WaitEvent:
+    """Yielded by wait_event() to tell the Scheduler running the script which event it is waiting for"""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Signal:
+    """A state change that scripts can wait for (see wait_signal) instead of checking for it every frame.
+
+    Usage:
+        score_changed = Signal()
+        ...
+        yield from wait_until(is_game_over, score_changed)  # only calls is_game_over after a change
+        ...
+        score_changed.fire()  # wherever the score changes
+
+    A script run by a Scheduler is parked until the Signal fires. A script stepped directly with next() only
+    compares a counter each frame."""
+    def __init__(self) -> None:
+        self.count = 0  # number of times fired
+        self.value: Any = None  # value of the last fire()
+        self._listeners: List[Callable[[Any], None]] = []
+
+    def fire(self, value: Any = None) -> None:
+        self.count += 1
+        self.value = value
+        listeners = self._listeners
+        self._listeners = []
+        for listener in listeners:
+            listener(value)
+
+    def add_listener(self, listener: Callable[[Any], None]) -> None:
+        """Call listener with the fired value the next time the Signal fires (once)"""
+        self._listeners.append(listener)
+
 
 # A generator function used for async "scripting" of game events. A "Generator Script".
-GenScript = Generator[None, None, None]
+GenScript = Generator[Union[None, Sleep, WaitEvent, Signal], Any, None]
+# Anything a Scheduler can run: a generator script or an "async def" coroutine (see gnp.arcadelib.asyncutl)
+Script = Union[GenScript, Coroutine[Any, Any, None]]
 
 
 class Scheduler:
-    """A Scheduler that manages a pool of generators and updataes them once a frame"""
-    def __init__(self) -> None:
-        self._pool: List[GenScript] = []
+    """A Scheduler that manages a pool of generators and updates them once a frame
+
+    A generator that yields a Sleep (as sleep() does) using the same clock as the Scheduler is parked in a
+    queue ordered by wake time and isn't stepped again until that time comes. One that yields a WaitEvent (as
+    wait_event() does) isn't stepped again until that event is signaled. Everything else is stepped every
+    update, so the cost of an update grows with the scripts that have work to do, not with all of them.
+    Scripts waiting on a Signal (as wait_signal() and the waits given a `changed` Signal do) aren't stepped
+    again until it fires.
+
+    "async def" coroutines that await the awaitables in gnp.arcadelib.asyncutl can be added too. They are
+    stepped the same way.
+
+    `clock` returns the current time in seconds. Defaults to the wall clock."""
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._pool: List[Tuple[Script, Any]] = []  # (script, value to send it), stepped every update
+        self._sleeping: List[Tuple[float, int, Script]] = []  # heap of (wake time, sequence number, script)
+        self._sequence = itertools.count()  # keeps scripts that wake at the same time in the order they slept
+        self._waiting: Dict[str, List[Script]] = {}  # event name -> scripts waiting for it
+        self._parked = 0  # number of scripts waiting on a Signal
 
-    def add(self, gen: GenScript) -> None:
-        """Add generator to pool"""
+    def __len__(self) -> int:
+        waiting = sum(len(scripts) for scripts in self._waiting.values())
+        return len(self._pool) + len(self._sleeping) + waiting + self._parked
+
+    def add(self, gen: Script) -> None:
+        """Add generator (or coroutine) to pool"""
+        # update generator before adding it to Pool to run code that exists before the first "yield".
+        self._step(gen, None)
+
+    def _step(self, gen: Script, value: Any) -> None:
+        """Step the generator once and file it by what it is waiting for. Finished generators are dropped."""
         try:
-            # update generator before adding it to Pool to run code that exists before the first "yield".
-            next(gen)
-            self._pool.append(gen)
-        except StopIteration as e:
-            pass
+            waiting_on = gen.send(value)
+        except StopIteration:
+            return
+        if isinstance(waiting_on, Sleep) and waiting_on.clock == self._clock:
+            heapq.heappush(self._sleeping, (waiting_on.wake_time, next(self._sequence), gen))
+        elif isinstance(waiting_on, WaitEvent):
+            self._waiting.setdefault(waiting_on.name, []).append(gen)
+        elif isinstance(waiting_on, Signal):
+            self._parked += 1
+            waiting_on.add_listener(lambda value: self._wake(gen, value))
+        else:
+            self._pool.append((gen, None))
+
+    def _wake(self, gen: Script, value: Any) -> None:
+        self._parked -= 1
+        self._pool.append((gen, value))
+
+    def signal(self, name: str, value: Any = None) -> None:
+        """Wake every script waiting for the named event. They are stepped on the next update and `value` is
+        what their wait_event() returns. Scripts that start waiting afterwards wait for the next signal."""
+        for gen in self._waiting.pop(name, ()):
+            self._pool.append((gen, value))
 
     def update(self) -> None:
-        """Update all generators, removing any that are complete"""
-        to_del: List[GenScript] = []
-        for gen in self._pool:
-            try:
-                next(gen)
-            except StopIteration as e:
-                to_del.append(gen)
-        for g in to_del:
-            self._pool.remove(g)
-
-
-def wait_until(predicate: Callable[[], bool]) -> GenScript:
-    """Utility generator that blocks until given predicate evaluates to true"""
+        """Update all generators that are not sleeping or are done sleeping, removing any that are complete"""
+        ready = self._pool
+        self._pool = []
+        now = self._clock()
+        while self._sleeping and self._sleeping[0][0] <= now:
+            ready.append((heapq.heappop(self._sleeping)[2], None))
+        for gen, value in ready:
+            self._step(gen, value)
+
+
+def wait_signal(signal: Signal) -> Generator[Signal, Any, Any]:
+    """Utility generator that blocks until the Signal fires, then returns the value it was fired with"""
+    count = signal.count
+    while signal.count == count:
+        yield signal
+    return signal.value
+
+
+def wait_until(predicate: Callable[[], bool], changed: Optional[Signal] = None) -> GenScript:
+    """Utility generator that blocks until given predicate evaluates to true
+
+    If the predicate can only change when the `changed` Signal fires, pass it in so the predicate is only
+    evaluated after a fire instead of every frame."""
     while True:
         if predicate():
             break
-        yield
+        if changed is None:
+            yield None
+        else:
+            yield from wait_signal(changed)
 
 
 T = TypeVar("T")
 
 
-def wait_until_non_none(func: Callable[[], Optional[T]]) -> Generator[None, None, T]:
-    """Utility generator that blocks until given function returns a non-None, then returns that value."""
+def wait_until_non_none(func: Callable[[], Optional[T]], changed: Optional[Signal] = None) -> Generator[Any, Any, T]:
+    """Utility generator that blocks until given function returns a non-None, then returns that value.
+
+    As with wait_until, `changed` is a Signal that fires whenever the function's result may have changed."""
     # Note that the callable "func" is expected to return None ("Optional[T]"). But, wait_until_non_none guarantees the
     # return value is non-none ("T").
     # Edge case: if "None" is a value you want to return, this function won't be useful.
     while True:
         val = func()
-        if val is None:
+        if val is not None:
+            return val
+        if changed is None:
             yield
         else:
-            return val
+            yield from wait_signal(changed)
+
 
+def sleep(delay: float, clock: Callable[[], float] = time.time) -> GenScript:
+    """Utility generator that blocks for the given amount of time
 
-def sleep(delay: float) -> GenScript:
-    """Utility generator that blocks for the given amount of time"""
-    start = time.time()
+    `clock` returns the current time in seconds. Defaults to the wall clock. A Scheduler using the same clock
+    doesn't step the script again until the time is up."""
+    start = clock()
     end = start + delay
-    while time.time() < end:
-        yield
+    wake = Sleep(end, clock)
+    while clock() < end:
+        yield wake
+
+
+def wait_event(name: str) -> Generator[WaitEvent, Any, Any]:
+    """Utility generator that blocks until the Scheduler running the script is signaled with the named event,
+    then returns the value it was signaled with. Only works in a script run by a Scheduler."""
+    value = yield WaitEvent(name)
+    return value
@@ -0,0 +1,82 @@
+"""
+Text that is rendered once and redrawn from its texture, rather than laid out again every frame
+"""
+from typing import Optional, Tuple, Union
+
+import arcade
+
+
+class Label:
+    """A piece of text at a fixed place on screen, rendered to a texture only when its text changes.
+
+    Usage:
+        score_label = Label(50, 5, arcade.color.WHITE, 20)
+
+        def on_draw(self):
+            score_label.text = f'Score: {score}'  # only re-rendered if this differs from the last text
+            score_label.draw()
+
+    Unlike arcade.draw_text(), drawing a Label that hasn't changed doesn't build a cache key or move a
+    Sprite, and a Label never shares a cache that can be emptied by other text. Positioning matches draw_text():
+    (x, y) is where the `anchor_x`/`anchor_y` point of the text goes."""
+    def __init__(self, x: float, y: float, color: arcade.arcade_types.Color, font_size: float = 12, text: str = '',
+                 width: int = 0, align: str = 'left', font_name: Union[str, Tuple[str, ...]] = ('calibri', 'arial'),
+                 anchor_x: str = 'left', anchor_y: str = 'baseline'):
+        self.x = x
+        self.y = y
+        self.color = color
+        self.font_size = font_size
+        self.width = width
+        self.align = align
+        self.font_name = font_name
+        self.anchor_x = anchor_x
+        self.anchor_y = anchor_y
+        self.render_count = 0  # number of times the text was rendered, to check that a screen isn't re-rendering
+        self._text = text
+        self._sprites: Optional[arcade.SpriteList] = None  # None until rendered, and when the text changes
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        if text != self._text:
+            self._text = text
+            self._sprites = None
+
+    def draw(self) -> None:
+        if not self._text:
+            return
+        sprites = self._sprites
+        if sprites is None:
+            sprites = self._sprites = self._render()
+        sprites.draw()
+
+    def _render(self) -> arcade.SpriteList:
+        image = arcade.get_text_image(self._text, self.color, self.font_size, self.width, self.align,
+                                      font_name=self.font_name)
+        self.render_count += 1
+        sprite = arcade.Sprite()
+        # a new SpriteList each time, as one that is given new textures keeps the old ones in its atlas
+        sprite.texture = arcade.Texture(f'Label-{id(self)}-{self.render_count}', image)
+        # placed by its center, as left/top/etc. follow the hit box, which leaves out the transparent edges
+        if self.anchor_x == 'left':
+            sprite.center_x = self.x + sprite.width / 2
+        elif self.anchor_x == 'center':
+            sprite.center_x = self.x
+        elif self.anchor_x == 'right':
+            sprite.center_x = self.x - sprite.width / 2
+        else:
+            raise ValueError(f"anchor_x should be 'left', 'center', or 'right'. Not '{self.anchor_x}'")
+        if self.anchor_y == 'top':
+            sprite.center_y = self.y - sprite.height / 2
+        elif self.anchor_y == 'center':
+            sprite.center_y = self.y
+        elif self.anchor_y in ('bottom', 'baseline'):
+            sprite.center_y = self.y + sprite.height / 2
+        else:
+            raise ValueError(f"anchor_y should be 'top', 'center', 'bottom', or 'baseline'. Not '{self.anchor_y}'")
+        sprites = arcade.SpriteList()
+        sprites.append(sprite)
+        return sprites
@@ -1,4 +1,32 @@
-from typing import List, Tuple, Callable
+import heapq
+import itertools
+from typing import List, Optional, Callable
+
+
+class TimerHandle:
+    """Returned by Timers.add(). Can be used to cancel or reschedule the timer before it triggers."""
+    __slots__ = ('_timers', 'callback', 'trigger_time', '_entry')
+
+    def __init__(self, timers: "Timers", callback: Callable):
+        self._timers = timers
+        self.callback = callback
+        self.trigger_time = 0.0
+        self._entry: Optional[list] = None  # the timer's entry in the heap. None once triggered or cancelled.
+
+    @property
+    def active(self) -> bool:
+        """True until the timer triggers or is cancelled"""
+        return self._entry is not None
+
+    def cancel(self) -> None:
+        """Stop the timer from triggering. Does nothing if it already triggered or was cancelled."""
+        self._timers._cancel(self)
+
+    def reschedule(self, timer_delay: float) -> None:
+        """Trigger the timer `timer_delay` seconds from now instead of when it was due. Also revives a timer
+        that already triggered or was cancelled."""
+        self._timers._cancel(self)
+        self._timers._schedule(self, timer_delay)
 
 
 class Timers:
@@ -7,35 +35,69 @@ class Timers:
     Usage:
         timers = Timers()
         timers.add(7, GlobalFunction)   # can use global functions as callbacks
-        timers.add(2.5, self.GotTimer)  # can use class member functions as callbacks
+        handle = timers.add(2.5, self.GotTimer)  # can use class member functions as callbacks
+        handle.cancel()  # or handle.reschedule(5)
+
+        Don't forget to call Timers.update(time_delta) each frame...
 
-        Don't forget to call Timers.step(time_delta) each frame...
+    Timers can run on a shared clock instead (ex: a GameClock), in which case update() reads the time from
+    the clock and its time_delta argument isn't needed:
+        timers = Timers(clock)
+        timers.update()
+
+    Timers are kept in a heap ordered by trigger time, so update() only looks at the timers that are due.
+    Cancelling leaves the timer's entry in the heap, marked dead, until it reaches the top of the heap or the
+    dead entries outnumber the live ones.
     """
 
-    def __init__(self):
-        self._elapsed_seconds = 0.0
-        self._timers: List[Tuple[float, Callable[..., None]]] = []
-
-    # def add(self, timer_delay: float, callback: Callable[..., None]) -> None:
-    def add(self, timer_delay: float, callback: Callable) -> None:
-        trigger_time = self._elapsed_seconds + timer_delay
-        self._timers.append((trigger_time, callback))
-
-    def update(self, time_delta: float) -> None:
-        """OPTIMIZE: If their are a large number of timers, I could keep the timer list sorted
-        in order of when they will be triggered.  This way, I can search the list for the expired
-        timers, and the first non-expired timer I find I can stop looking thru the whole list."""
-        self._elapsed_seconds += time_delta
-        timers_to_del = []
-        for timer in self._timers:
-            if timer[0] < self._elapsed_seconds:
-                timer[1]()  # call callback
-                timers_to_del.append(timer)
-        # delete expired timers
-        for t in timers_to_del:
-            self._timers.remove(t)
+    def __init__(self, clock: Optional[Callable[[], float]] = None):
+        self._clock = clock
+        self._elapsed_seconds = clock() if clock else 0.0
+        self._heap: List[list] = []  # entries are [trigger time, sequence number, handle or None if cancelled]
+        self._sequence = itertools.count()  # orders timers with the same trigger time by when they were added
+        self._cancelled_count = 0
 
-    def dbg_print(self) -> None:
-        for idx, timer in enumerate(self._timers):
-            print(f'{idx} - {timer[0]} -> {repr(timer[1])}')
+    def __len__(self) -> int:
+        """Number of timers that haven't triggered or been cancelled"""
+        return len(self._heap) - self._cancelled_count
+
+    def add(self, timer_delay: float, callback: Callable) -> TimerHandle:
+        handle = TimerHandle(self, callback)
+        self._schedule(handle, timer_delay)
+        return handle
+
+    def _schedule(self, handle: TimerHandle, timer_delay: float) -> None:
+        now = self._clock() if self._clock else self._elapsed_seconds
+        handle.trigger_time = now + timer_delay
+        handle._entry = [handle.trigger_time, next(self._sequence), handle]
+        heapq.heappush(self._heap, handle._entry)
 
+    def _cancel(self, handle: TimerHandle) -> None:
+        if handle._entry is None:
+            return
+        handle._entry[2] = None
+        handle._entry = None
+        self._cancelled_count += 1
+        if self._cancelled_count > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if entry[2] is not None]
+            heapq.heapify(self._heap)
+            self._cancelled_count = 0
+
+    def update(self, time_delta: float = 0.0) -> None:
+        if self._clock:
+            self._elapsed_seconds = self._clock()
+        else:
+            self._elapsed_seconds += time_delta
+        heap = self._heap
+        while heap and heap[0][0] < self._elapsed_seconds:
+            handle = heapq.heappop(heap)[2]
+            if handle is None:
+                self._cancelled_count -= 1
+                continue
+            handle._entry = None
+            handle.callback()  # call callback. It may add, cancel or reschedule timers.
+            heap = self._heap  # a cancel in the callback may have rebuilt the heap
+
+    def dbg_print(self) -> None:
+        for idx, entry in enumerate(sorted(entry for entry in self._heap if entry[2] is not None)):
+            print(f'{idx} - {entry[0]} -> {repr(entry[2].callback)}')
@@ -0,0 +1,45 @@
+"""
+Fixed timestep game loop support, so game speed doesn't depend on the frame rate
+"""
+
+
+class FixedTimestep:
+    """Turns variable frame times into a number of fixed-size simulation ticks.
+
+    Usage:
+        timestep = FixedTimestep(tick_rate=60, max_ticks=5)
+
+        def update(self, delta_time):  # called once per displayed frame
+            for _ in range(timestep.advance(delta_time)):
+                simulate(timestep.dt)
+
+    Elapsed time is accumulated and as many ticks are run as it takes to catch up. If a frame runs so long
+    that more than `max_ticks` would be needed, the extra time is dropped and the game slows down instead
+    of spiraling into ever longer frames.
+    """
+    # allowance for floating point error when the frame time is an exact multiple of the tick time
+    EPSILON = 1e-9
+
+    def __init__(self, tick_rate: float, max_ticks: int):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self._accumulator = 0.0
+        self.dropped_time = 0.0  # total time thrown away because of the catch-up limit
+
+    def advance(self, delta_time: float) -> int:
+        """Add the time elapsed since the last frame and return the number of ticks to run"""
+        self._accumulator += delta_time
+        ticks = 0
+        while self._accumulator + self.EPSILON >= self.dt:
+            if ticks == self.max_ticks:
+                self.dropped_time += self._accumulator
+                self._accumulator = 0.0
+                break
+            self._accumulator -= self.dt
+            ticks += 1
+        return ticks
+
+    @property
+    def alpha(self) -> float:
+        """How far (0.0-1.0) the current time is between the last tick and the next one. Useful for interpolation."""
+        return max(self._accumulator, 0.0) / self.dt
@@ -0,0 +1,4 @@
+import pyglet
+
+# the tests use arcade without opening a window, so they can run with no display (see flapping.simulation)
+pyglet.options['shadow_window'] = False
@@ -0,0 +1,114 @@
+"""Actor containers and leak checks (gnp.arcadelib.actor)"""
+from gnp.arcadelib.actor import Actor, ActorList, GrowthCheck
+
+
+class Countdown(Actor):
+    """Reapable after `ticks` updates"""
+    def __init__(self, ticks, log=None):
+        self.ticks = ticks
+        self.log = log
+        self.killed = False
+
+    def update(self, delta_time):
+        self.ticks -= 1
+        if self.log is not None:
+            self.log.append((self, delta_time))
+
+    def draw(self):
+        pass
+
+    def can_reap(self):
+        return self.killed or self.ticks <= 0
+
+    def kill(self):
+        self.killed = True
+
+
+class NoDeltaTime(Countdown):
+    """Like arcade.Emitter, update() takes no delta_time"""
+    def update(self):
+        super().update(None)
+
+
+class Spawner(Countdown):
+    def __init__(self, actors, log):
+        super().__init__(1, log)
+        self.actors = actors
+        self.spawned = []
+
+    def update(self, delta_time):
+        super().update(delta_time)
+        self.spawned.append(Countdown(1, self.log))
+        self.actors.append(self.spawned[-1])
+
+
+def test_update_reaps_in_one_pass_and_keeps_order():
+    log = []
+    actors = ActorList([Countdown(2), Countdown(1), NoDeltaTime(3, log), Countdown(1), NoDeltaTime(1, log)])
+    survivors = [actors[0], actors[2]]
+    no_delta_time = [actors[2], actors[4]]
+    actors.update(0.5)
+    assert list(actors) == survivors
+    assert log == [(no_delta_time[0], None), (no_delta_time[1], None)]  # called without delta_time
+    actors.update(0.5)
+    assert list(actors) == [survivors[1]]
+    actors.update(0.5)
+    assert list(actors) == []
+
+
+def test_actors_appended_during_update_are_updated():
+    log = []
+    actors = ActorList()
+    spawner = Spawner(actors, log)
+    actors.append(spawner)
+    actors.update(0.25)
+    assert [actor for actor, _ in log] == [spawner] + spawner.spawned
+    assert all(delta_time == 0.25 for _, delta_time in log)
+    assert list(actors) == []
+
+
+def test_reset_owner_kills_only_that_owners_actors():
+    actors = ActorList()
+    first = [Countdown(5), Countdown(5)]
+    second = Countdown(5)
+    unowned = Countdown(5)
+    for actor in first:
+        actors.add_owned(actor, 'first')
+    actors.add_owned(second, 'second')
+    actors.append(unowned)
+    actors.reset_owner('first')
+    assert all(actor.killed for actor in first)
+    assert list(actors) == [second, unowned]
+    actors.reset_owner('nobody')
+    assert list(actors) == [second, unowned]
+
+
+def test_reaped_actors_are_forgotten_by_their_owner():
+    actors = ActorList()
+    short = Countdown(1)
+    actors.add_owned(short, 'owner')
+    actors.update(0.1)
+    assert list(actors) == []
+    assert not actors._owned
+    actors.reset_owner('owner')  # nothing left to kill
+    assert not short.killed
+
+
+def test_count_by_type_includes_nested_lists():
+    actors = ActorList([Countdown(1), NoDeltaTime(1), ActorList([Countdown(1), ActorList([NoDeltaTime(1)])])])
+    assert actors.count_by_type() == {'Countdown': 2, 'NoDeltaTime': 2}
+    assert ActorList().count_by_type() == {}
+
+
+def test_growth_check_flags_steady_growth_only():
+    check = GrowthCheck(samples=3)
+    history = [
+        {'leak': 1, 'busy': 5, 'gone': 2},
+        {'leak': 2, 'busy': 9, 'gone': 3},
+        {'leak': 3, 'busy': 2, 'gone': 4},
+    ]
+    for counts in history:
+        assert check.sample(counts) == []  # not enough samples yet
+    assert check.sample({'leak': 4, 'busy': 7, 'gone': 5}) == ['leak', 'gone']
+    assert check.sample({'leak': 5, 'busy': 3}) == ['leak']  # a count that is no longer reported dropped to 0
+    assert check.sample({'leak': 5, 'busy': 4}) == []  # leak stopped growing
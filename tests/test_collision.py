@@ -0,0 +1,54 @@
+"""Collision tests (flapping.collision) against simple reference versions"""
+import itertools
+import random
+
+import numpy as np
+
+from flapping import collision
+from flapping.collision import Rect
+
+
+def random_rects(rand, count, size=60):
+    # whole numbers on a small field, so there are plenty of overlapping, touching and concentric boxes
+    return [Rect(rand.randint(0, size), rand.randint(0, size), rand.randint(1, 20), rand.randint(1, 20))
+            for _ in range(count)]
+
+
+def test_intersect_AABB_batch_matches_intersect_AABB():
+    rand = random.Random(1)
+    rects = random_rects(rand, 40)
+    # the same box twice (zero delta) and boxes centered on each other
+    rects += [Rect(10, 10, 8, 8), Rect(10, 10, 8, 8), Rect(12, 12, 4, 4), Rect(30, 0, 4, 20)]
+    centers = np.array([(r.center_x, r.center_y) for r in rects])
+    half_sizes = np.array([(r.width / 2, r.height / 2) for r in rects])
+
+    hit, delta, normal = collision.intersect_AABB_batch(
+        centers[:, np.newaxis], half_sizes[:, np.newaxis], centers[np.newaxis], half_sizes[np.newaxis])
+    assert hit.shape == (len(rects), len(rects))
+    for i, j in itertools.product(range(len(rects)), repeat=2):
+        expected = collision.intersect_AABB(rects[i], rects[j])
+        assert hit[i, j] == (expected is not None), (i, j)
+        if expected is None:
+            assert tuple(delta[i, j]) == (0, 0)
+            assert tuple(normal[i, j]) == (0, 0)
+        else:
+            assert tuple(delta[i, j]) == expected.delta, (i, j)
+            assert tuple(normal[i, j]) == expected.normal, (i, j)
+
+
+def test_intersect_AABB_batch_one_against_many():
+    rects = [Rect(0, 0, 10, 10), Rect(9, 0, 10, 10), Rect(10, 0, 10, 10)]
+    hit, delta, normal = collision.intersect_AABB_batch(
+        (5, 5), (5, 5), [(r.center_x, r.center_y) for r in rects], [(r.width / 2, r.height / 2) for r in rects])
+    assert hit.tolist() == [True, True, False]  # touching edges aren't an intersection
+    assert delta.shape == normal.shape == (3, 2)
+
+
+def test_sweep_and_prune_matches_brute_force():
+    rand = random.Random(2)
+    for count in (0, 1, 2, 10, 50):
+        rects = random_rects(rand, count)
+        expected = [(i, j) for i, j in itertools.combinations(range(count), 2)
+                    if rects[i].left <= rects[j].right and rects[j].left <= rects[i].right
+                    and rects[i].bottom <= rects[j].top and rects[j].bottom <= rects[i].top]
+        assert collision.sweep_and_prune(rects) == expected
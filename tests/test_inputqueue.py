@@ -0,0 +1,67 @@
+"""Queued input (gnp.arcadelib.inputqueue)"""
+from gnp.arcadelib.inputqueue import InputQueue
+
+
+def drain_ids(queue):
+    return [input_id for input_id, _, _, _ in queue.drain()]
+
+
+def test_drain_is_oldest_first_and_empties_the_queue():
+    queue = InputQueue(capacity=4)
+    queue.push(1)
+    queue.push(2, 1, -1)
+    queue.push(3)
+    assert len(queue) == 3
+    events = list(queue.drain())
+    assert [event[:3] for event in events] == [(1, 0, 0), (2, 1, -1), (3, 0, 0)]
+    arrivals = [event[3] for event in events]
+    assert arrivals == sorted(arrivals)
+    assert len(queue) == 0
+    assert drain_ids(queue) == []
+
+
+def test_order_is_kept_across_the_end_of_the_ring():
+    queue = InputQueue(capacity=4)
+    next_id = 0
+    for batch in (3, 2, 4, 1, 3):  # each drain leaves the head somewhere else in the ring
+        pushed = list(range(next_id, next_id + batch))
+        for input_id in pushed:
+            queue.push(input_id)
+        next_id += batch
+        assert drain_ids(queue) == pushed
+    assert queue.dropped_count == 0
+
+
+def test_full_queue_drops_new_events():
+    queue = InputQueue(capacity=3)
+    queue.push(0)
+    assert drain_ids(queue) == [0]  # so the ring is full across its end
+    for input_id in range(1, 6):
+        queue.push(input_id)
+    assert len(queue) == 3
+    assert queue.dropped_count == 2
+    assert drain_ids(queue) == [1, 2, 3]
+    queue.push(6)  # room again after draining
+    assert drain_ids(queue) == [6]
+    assert queue.dropped_count == 2
+
+
+def test_events_pushed_while_draining_are_drained_too():
+    queue = InputQueue(capacity=4)
+    queue.push(1)
+    drained = []
+    for input_id, _, _, _ in queue.drain():
+        drained.append(input_id)
+        if input_id < 3:
+            queue.push(input_id + 1)
+    assert drained == [1, 2, 3]
+
+
+def test_clear():
+    queue = InputQueue(capacity=2)
+    queue.push(1)
+    queue.push(2)
+    queue.clear()
+    assert len(queue) == 0
+    queue.push(3)
+    assert drain_ids(queue) == [3]
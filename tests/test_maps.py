@@ -0,0 +1,53 @@
+"""Compiled maps (flapping.maps)"""
+import os.path
+import shutil
+import struct
+
+import pytest
+
+import flapping
+from flapping import maps
+
+MAP_DIR = os.path.join(os.path.dirname(flapping.__file__), 'resources', 'map')
+
+
+@pytest.fixture
+def tmx(tmp_path, monkeypatch):
+    """A copy of a map and its tileset, whose compiled file doesn't touch the package"""
+    monkeypatch.chdir(os.path.dirname(flapping.__file__))  # tile images are found relative to the package
+    for name in ('map1.tmx', 'map_tileset.tsx'):
+        shutil.copy(os.path.join(MAP_DIR, name), str(tmp_path))
+    return str(tmp_path / 'map1.tmx')
+
+
+def rects(wall_rects):
+    return [(rect.left, rect.bottom, rect.width, rect.height) for rect in wall_rects]
+
+
+def test_compiled_map_matches_tmx(tmx):
+    compiled = maps.compile_map(tmx)
+    from_tmx = maps.load_tmx(tmx)
+    from_compiled = maps.load_map(tmx)
+    assert os.path.exists(compiled)
+    assert [s.position for s in from_compiled.walls] == [s.position for s in from_tmx.walls]
+    assert [s.position for s in from_compiled.killers] == [s.position for s in from_tmx.killers]
+    assert rects(from_compiled.tile_grid.wall_rects) == rects(from_tmx.tile_grid.wall_rects)
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:8] + struct.pack('<I', 0) + data[12:],  # another version of the format
+    lambda data: b'NOTAMAP\0' + data[8:],
+    lambda data: data[:10],
+    lambda data: b'',
+])
+def test_unreadable_compiled_map_is_recompiled(tmx, damage):
+    compiled = maps.compile_map(tmx)
+    with open(compiled, 'rb') as in_file:
+        good = in_file.read()
+    with open(compiled, 'wb') as out_file:
+        out_file.write(damage(good))
+
+    loaded = maps.load_map(tmx)
+    assert len(loaded.walls) == len(maps.load_tmx(tmx).walls)
+    with open(compiled, 'rb') as in_file:
+        assert in_file.read() == good
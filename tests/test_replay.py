@@ -0,0 +1,115 @@
+"""Record/replay of matches (flapping.replay) against the headless Simulation"""
+import os.path
+import random
+
+import pytest
+
+import flapping
+from flapping import flapping_cfg as CFG
+from flapping import replay
+from flapping.simulation import Simulation
+
+TICK = 1 / CFG.Game.tick_rate
+
+
+@pytest.fixture(autouse=True)
+def match_setup(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(flapping.__file__))  # maps and images are loaded relative to the package
+    monkeypatch.setattr(CFG.Game, 'goal_score', 2)  # short rounds, so a test covers several
+
+
+def record_match(filename, pre_match_ticks, ticks, seed=5, player_count=4):
+    """Play a match with random input after `pre_match_ticks` of other screens, recording it.
+
+    Returns the sim and the number of times the scoreboard was left."""
+    sim = Simulation(1280, 720)
+    for _ in range(pre_match_ticks):  # as the welcome and registration screens do
+        sim.update(TICK)
+    for name in sorted(CFG.Registration.avatars)[:player_count]:
+        sim.add_player(name)
+    recorder = replay.Recorder(filename, sim, seed)
+    script = sim.match_script(seed)
+    next(script)
+    rand = random.Random(seed)
+    scoreboards = 0
+    for _ in range(ticks):
+        for player in sim.player_list:
+            roll = rand.random()
+            action = (player.on_up if roll < 0.05 else
+                      player.on_left if roll < 0.07 else
+                      player.on_right if roll < 0.09 else
+                      player.on_left_release if roll < 0.1 else
+                      player.on_right_release if roll < 0.11 else None)
+            if action is not None:
+                recorder.record(action)
+                action()
+        if sim.state == Simulation.SCOREBOARD and sim.scoreboard_sub_state == 'ready' and rand.random() < 0.1:
+            recorder.record_continue()
+            sim.scoreboard_sub_state = 'done'
+            scoreboards += 1
+        sim.update(TICK)
+        next(script)
+    recorder.close()
+    return sim, scoreboards
+
+
+def outcome(sim):
+    return (sim.round_num, sim.state, [(p.name, p.score, p.round_wins, p.position) for p in sim.player_list])
+
+
+@pytest.mark.parametrize('pre_match_ticks', [0, 377, 2500])
+def test_replay_matches_recording(tmp_path, pre_match_ticks):
+    filename = str(tmp_path / 'match.rec')
+    live, scoreboards = record_match(filename, pre_match_ticks, ticks=3000)
+    assert scoreboards >= 3  # covers round ends and the scoreboard, where the sleeps are
+
+    played = replay.play(replay.load(filename))
+    assert played.tick_count == live.tick_count - pre_match_ticks
+    assert outcome(played) == outcome(live)
+
+
+def test_log_round_trip(tmp_path):
+    filename = str(tmp_path / 'match.rec')
+    sim = Simulation(1280, 720)
+    sim.update(TICK)
+    first, second = sim.add_player('Ruby'), sim.add_player('Azul')
+    recorder = replay.Recorder(filename, sim, seed=1234)
+    recorder.record(first.on_up)
+    recorder.record(second.on_joyhat, -1, 1)
+    sim.update(TICK)
+    recorder.record(first.on_left_release)
+    recorder.record(print)  # not a Player action, so not recorded
+    sim.update(TICK)
+    recorder.record_continue()
+    recorder.close()
+
+    loaded = replay.load(filename)
+    assert loaded.start_time == TICK  # the clock time when recording started
+    assert (loaded.seed, loaded.goal_score, loaded.width, loaded.height) == (1234, CFG.Game.goal_score, 1280, 720)
+    assert loaded.player_names == ['Ruby', 'Azul']
+    assert loaded.records == [
+        replay.Record(0, 0, replay.ACTIONS.index('on_up'), 0, 0),
+        replay.Record(0, 1, replay.ACTIONS.index('on_joyhat'), -1, 1),
+        replay.Record(1, 0, replay.ACTIONS.index('on_left_release'), 0, 0),
+        replay.Record(2, replay.CONTINUE, 0, 0, 0),
+        replay.Record(2, replay.END, 0, 0, 0),
+    ]
+
+    # a log cut off mid-record (ex: by a crash) loads up to its last whole record
+    with open(filename, 'rb') as in_file:
+        data = in_file.read()
+    with open(filename, 'wb') as out_file:
+        out_file.write(data[:-3])
+    assert replay.load(filename).records == loaded.records[:-1]
+
+
+def test_load_rejects_other_files(tmp_path):
+    filename = str(tmp_path / 'match.rec')
+    with open(filename, 'wb') as out_file:
+        out_file.write(b'FLAPREC1' + bytes(32))
+    with pytest.raises(ValueError, match='another version'):
+        replay.load(filename)
+    with open(filename, 'wb') as out_file:
+        out_file.write(b'not a replay')
+    with pytest.raises(ValueError, match='not a replay'):
+        replay.load(filename)
@@ -0,0 +1,157 @@
+"""Scheduler and script utilities (gnp.arcadelib.scriptutl, gnp.arcadelib.asyncutl)"""
+from gnp.arcadelib import asyncutl, scriptutl
+from gnp.arcadelib.clock import GameClock
+
+
+def run_frames(sched, clock, frames, dt=0.25):
+    for _ in range(frames):
+        clock.advance(dt)
+        sched.update()
+
+
+def test_sleepers_wake_in_wake_time_order_and_ties_in_sleep_order():
+    clock = GameClock()
+    sched = scriptutl.Scheduler(clock)
+    woke = []
+
+    def sleeper(name, delay):
+        yield from scriptutl.sleep(delay, clock)
+        woke.append((name, clock()))
+    for name, delay in [('c', 1.0), ('a', 0.5), ('b1', 0.75), ('b2', 0.75)]:
+        sched.add(sleeper(name, delay))
+    assert len(sched) == 4
+
+    run_frames(sched, clock, 4)
+    assert woke == [('a', 0.5), ('b1', 0.75), ('b2', 0.75), ('c', 1.0)]
+    assert len(sched) == 0
+
+
+def test_sleeping_script_is_not_stepped_until_due():
+    clock = GameClock()
+    sched = scriptutl.Scheduler(clock)
+    steps = []
+    woke = []
+
+    def script():
+        for wake in scriptutl.sleep(10.0, clock):
+            steps.append(clock())
+            yield wake
+        woke.append(clock())
+    sched.add(script())
+    run_frames(sched, clock, 39)
+    assert steps == [0.0]  # only the step that started the sleep
+    assert woke == []
+    run_frames(sched, clock, 1)
+    assert steps == [0.0]
+    assert woke == [10.0]
+
+
+def test_script_sleeping_in_a_loop_wakes_each_time():
+    clock = GameClock()
+    sched = scriptutl.Scheduler(clock)
+    ticks = []
+
+    def ticker():
+        for _ in range(3):
+            yield from scriptutl.sleep(0.5, clock)
+            ticks.append(clock())
+    sched.add(ticker())
+    run_frames(sched, clock, 8)
+    assert ticks == [0.5, 1.0, 1.5]
+
+
+def test_wait_event_gets_the_signaled_value():
+    sched = scriptutl.Scheduler(GameClock())
+    received = []
+
+    def waiter(name):
+        received.append((name, (yield from scriptutl.wait_event('go'))))
+    sched.add(waiter('first'))
+    sched.add(waiter('second'))
+    sched.update()
+    sched.signal('other')
+    sched.update()
+    assert received == []
+
+    sched.signal('go', 42)
+    assert received == []  # stepped on the next update, not by signal()
+    sched.update()
+    assert received == [('first', 42), ('second', 42)]
+    assert len(sched) == 0
+
+
+def test_wait_until_with_signal_is_parked_until_it_fires():
+    sched = scriptutl.Scheduler(GameClock())
+    changed = scriptutl.Signal()
+    state = {'done': False, 'checks': 0}
+    finished = []
+
+    def predicate():
+        state['checks'] += 1
+        return state['done']
+
+    def script():
+        yield from scriptutl.wait_until(predicate, changed)
+        finished.append(True)
+    sched.add(script())
+    for _ in range(10):
+        sched.update()
+    assert state['checks'] == 1
+    assert len(sched) == 1
+
+    changed.fire()  # predicate still false: checked once more, then parked again
+    sched.update()
+    assert state['checks'] == 2 and finished == []
+    state['done'] = True
+    changed.fire()
+    sched.update()
+    assert finished == [True]
+    assert len(sched) == 0
+
+
+def test_wait_until_non_none_returns_value():
+    holder = {'value': None}
+    changed = scriptutl.Signal()
+    results = []
+
+    def script():
+        results.append((yield from scriptutl.wait_until_non_none(lambda: holder['value'], changed)))
+    gen = script()
+    next(gen)
+    holder['value'] = 'x'
+    changed.fire()
+    for _ in gen:  # stepped directly, the way Game steps its scripts
+        pass
+    assert results == ['x']
+
+
+def test_coroutines_and_generators_share_a_scheduler():
+    clock = GameClock()
+    sched = scriptutl.Scheduler(clock)
+    signal = scriptutl.Signal()
+    log = []
+
+    async def coroutine():
+        await asyncutl.sleep(0.5, clock)
+        log.append(('slept', clock()))
+        name = await asyncutl.event('joined')
+        log.append(('joined', name))
+        value = await asyncutl.fired(signal)
+        log.append(('fired', value))
+        await asyncutl.next_frame()
+        log.append(('done', clock()))
+
+    def generator():
+        yield from scriptutl.sleep(0.25, clock)
+        log.append(('generator', clock()))
+    sched.add(coroutine())
+    sched.add(generator())
+
+    run_frames(sched, clock, 2)
+    assert log == [('generator', 0.25), ('slept', 0.5)]
+    sched.signal('joined', 'Ruby')
+    run_frames(sched, clock, 1)
+    signal.fire(7)
+    run_frames(sched, clock, 2)
+    assert log[2:] == [('joined', 'Ruby'), ('fired', 7), ('done', 1.25)]
+    assert len(sched) == 0
@@ -0,0 +1,55 @@
+"""Rules of the headless Simulation (flapping.simulation)"""
+import os.path
+
+import pytest
+
+import flapping
+from flapping import flapping_cfg as CFG
+from flapping.collision import Rect
+from flapping.simulation import Simulation
+
+
+@pytest.fixture(autouse=True)
+def package_dir(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(flapping.__file__))  # maps and images are loaded relative to the package
+
+
+def make_sim(player_count=3):
+    sim = Simulation(1280, 720)
+    for name in sorted(CFG.Registration.avatars)[:player_count]:
+        sim.add_player(name)
+    return sim
+
+
+def test_setup_reuses_active_players_list():
+    sim = make_sim()
+    sim.setup(CFG.Game.maps[0])
+    active_players = sim.active_players
+    counts = sim.live_counts()
+    sim.player_list[0].kill()
+    for _ in range(3):
+        sim.setup(CFG.Game.maps[0])
+        assert sim.active_players is active_players
+        assert sim.live_counts()['player sprite_lists'] == counts['player sprite_lists'] - 1
+    sim.player_list[0].respawn()
+    sim.setup(CFG.Game.maps[0])
+    assert list(sim.active_players) == list(sim.player_list)
+    assert sim.live_counts()['player sprite_lists'] == counts['player sprite_lists']
+
+
+def test_diagonal_move_stops_at_wall():
+    # a move that is longer than the wall is thick, mostly downwards but that first hits the side of the wall
+    sim = make_sim(1)
+    sim.setup(CFG.Game.maps[0])
+    player = sim.player_list[0]
+    assert (player.width, player.height) == (32, 32)
+    wall = Rect(100, 0, 32, 400)
+    player.last_position = (60, 200)
+    player.position = (130, 20)
+    player.change_x, player.change_y = 70.0, -180.0
+
+    sim.check_wall_tiles_collision(player, [wall])
+    # moved back along both axes, to where it touched the wall (24 of the 70 pixels across)
+    assert player.right == wall.left
+    assert player.center_y == pytest.approx(200 - 180 * 24 / 70)
+    assert player.change_x == 0
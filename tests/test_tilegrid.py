@@ -0,0 +1,107 @@
+"""Grid index of a map's tiles (flapping.tilegrid), checked against testing every tile"""
+import random
+
+import arcade
+
+from flapping import collision
+from flapping.collision import Rect
+from flapping.tilegrid import TileGrid, merge_cells
+
+TILE = 16
+COLS = 12
+ROWS = 8
+
+
+def make_grid():
+    wall_rects = [
+        Rect(0, 0, COLS * TILE, TILE),  # floor
+        Rect(4 * TILE, 3 * TILE, TILE, 3 * TILE),  # pillar
+        Rect(7 * TILE, 5 * TILE, 4 * TILE, 2 * TILE),  # ledge
+    ]
+    killers = arcade.SpriteList()
+    for col, row in [(2, 1), (3, 1), (9, 1), (11, 7)]:
+        spike = arcade.SpriteSolidColor(TILE, TILE, arcade.color.RED)
+        spike.center_x = col * TILE + TILE / 2
+        spike.center_y = row * TILE + TILE / 2
+        killers.append(spike)
+    return TileGrid(COLS, ROWS, TILE, TILE, wall_rects, killers), wall_rects, killers
+
+
+def rect_cells(rect):
+    return {(col, row) for col in range(int(rect.left // TILE), int(rect.right // TILE))
+            for row in range(int(rect.bottom // TILE), int(rect.top // TILE))}
+
+
+def expected_hits(box, wall_rects, killers):
+    return ({id(rect) for rect in wall_rects if collision.intersect_AABB(box, rect)},
+            {id(killer) for killer in killers if collision.intersect_AABB(box, killer)})
+
+
+def test_check_for_collision_matches_every_tile():
+    grid, wall_rects, killers = make_grid()
+    rand = random.Random(3)
+    for _ in range(500):
+        # includes boxes that touch tiles exactly and boxes partly outside the map
+        box = Rect(rand.randint(-20, COLS * TILE), rand.randint(-20, ROWS * TILE), rand.randint(1, 40),
+                   rand.randint(1, 40))
+        wall_hits, killer_hits = grid.check_for_collision(box)
+        assert len(wall_hits) == len(set(map(id, wall_hits)))  # a merged wall is returned once
+        assert ({id(rect) for rect in wall_hits}, {id(killer) for killer in killer_hits}) == \
+            expected_hits(box, wall_rects, killers)
+
+
+def test_check_for_collision_covers_the_swept_region():
+    grid, wall_rects, killers = make_grid()
+    pillar = wall_rects[1]
+    # moved across the pillar in one step, without overlapping it at either end
+    box = Rect(pillar.right + 8, 4 * TILE, TILE, TILE)
+    start = (pillar.left - 8 - TILE / 2, box.center_y)
+    assert grid.check_for_collision(box) == ([], [])
+    wall_hits, killer_hits = grid.check_for_collision(box, start)
+    assert wall_hits == [pillar]
+    assert killer_hits == []  # kill tiles are only checked where the Sprite is now
+
+    rand = random.Random(4)
+    for _ in range(300):
+        box = Rect(rand.randint(0, COLS * TILE), rand.randint(TILE, ROWS * TILE), TILE, TILE)
+        start = (rand.randint(0, COLS * TILE), rand.randint(TILE, ROWS * TILE))
+        swept = Rect(min(box.left, start[0] - TILE / 2), min(box.bottom, start[1] - TILE / 2),
+                     abs(box.center_x - start[0]) + TILE, abs(box.center_y - start[1]) + TILE)
+        wall_hits, killer_hits = grid.check_for_collision(box, start)
+        assert {id(rect) for rect in wall_hits} == expected_hits(swept, wall_rects, killers)[0]
+        assert {id(killer) for killer in killer_hits} == expected_hits(box, wall_rects, killers)[1]
+
+
+def test_merge_cells_stacks_equal_runs():
+    rows = [  # top row first, as drawn
+        '..##..',
+        '######',
+        '######',
+        '#....#',
+    ]
+    cells = [c == '#' for line in reversed(rows) for c in line]
+    rects = merge_cells(cells, 6, 4, TILE, TILE)
+    assert sorted((r.left, r.bottom, r.width, r.height) for r in rects) == [
+        (0, 0, TILE, TILE),
+        (0, TILE, 6 * TILE, 2 * TILE),
+        (2 * TILE, 3 * TILE, 2 * TILE, TILE),
+        (5 * TILE, 0, TILE, TILE),
+    ]
+
+
+def test_merge_cells_covers_each_cell_once_and_keeps_runs_whole():
+    rand = random.Random(5)
+    for _ in range(200):
+        cols, rows = rand.randint(1, 10), rand.randint(1, 10)
+        cells = [rand.random() < 0.6 for _ in range(cols * rows)]
+        rects = merge_cells(cells, cols, rows, TILE, TILE)
+
+        covered = [cell for rect in rects for cell in rect_cells(rect)]
+        assert len(covered) == len(set(covered))  # no overlaps
+        assert set(covered) == {(idx % cols, idx // cols) for idx, occupied in enumerate(cells) if occupied}
+        # each horizontal run of cells is inside one rectangle, so there is no seam to catch on along it
+        for rect in rects:
+            for row in range(int(rect.bottom // TILE), int(rect.top // TILE)):
+                left, right = int(rect.left // TILE) - 1, int(rect.right // TILE)
+                assert left < 0 or not cells[row * cols + left]
+                assert right >= cols or not cells[row * cols + right]
@@ -0,0 +1,146 @@
+"""Timers (gnp.arcadelib.timers): trigger order, cancel and reschedule"""
+import random
+
+from gnp.arcadelib.clock import GameClock
+from gnp.arcadelib.timers import Timers
+
+
+def test_timers_trigger_in_time_order_and_ties_in_add_order():
+    timers = Timers()
+    fired = []
+    for name, delay in [('c', 3.0), ('a', 1.0), ('b1', 2.0), ('b2', 2.0), ('b3', 2.0)]:
+        timers.add(delay, lambda name=name: fired.append(name))
+    timers.update(2.5)
+    assert fired == ['a', 'b1', 'b2', 'b3']
+    timers.update(1.0)
+    assert fired == ['a', 'b1', 'b2', 'b3', 'c']
+    assert len(timers) == 0
+
+
+def test_timer_triggers_once_its_time_has_passed():
+    timers = Timers()
+    fired = []
+    timers.add(1.0, lambda: fired.append(1))
+    timers.update(1.0)
+    assert fired == []  # not at exactly the trigger time
+    timers.update(0.01)
+    assert fired == [1]
+
+
+def test_cancel():
+    timers = Timers()
+    fired = []
+    handle = timers.add(1.0, lambda: fired.append('cancelled'))
+    timers.add(2.0, lambda: fired.append('kept'))
+    handle.cancel()
+    assert not handle.active
+    assert len(timers) == 1
+    handle.cancel()  # cancelling again does nothing
+    assert len(timers) == 1
+    timers.update(3.0)
+    assert fired == ['kept']
+
+
+def test_reschedule_moves_timer_in_the_order():
+    timers = Timers()
+    fired = []
+    first = timers.add(1.0, lambda: fired.append('first'))
+    timers.add(2.0, lambda: fired.append('second'))
+    timers.update(0.5)
+    first.reschedule(2.0)  # from now: due at 2.5, after 'second'
+    assert first.trigger_time == 2.5
+    assert len(timers) == 2
+    timers.update(1.6)
+    assert fired == ['second']
+    timers.update(0.5)
+    assert fired == ['second', 'first']
+
+
+def test_reschedule_revives_triggered_or_cancelled_timer():
+    timers = Timers()
+    fired = []
+    handle = timers.add(1.0, lambda: fired.append(1))
+    timers.update(1.5)
+    assert not handle.active
+    handle.reschedule(1.0)
+    assert handle.active
+    timers.update(1.5)
+    assert fired == [1, 1]
+
+    handle.cancel()
+    handle.reschedule(1.0)
+    timers.update(1.5)
+    assert fired == [1, 1, 1]
+
+
+def test_callbacks_can_add_cancel_and_reschedule():
+    timers = Timers()
+    fired = []
+    later = [timers.add(5.0 + idx, lambda idx=idx: fired.append(f'later{idx}')) for idx in range(10)]
+
+    def first():
+        fired.append('first')
+        for handle in later[1:]:  # enough cancels to rebuild the heap during update()
+            handle.cancel()
+        later[0].reschedule(0.0)
+        timers.add(0.5, lambda: fired.append('added'))
+    timers.add(1.0, first)
+    timers.update(1.1)
+    assert fired == ['first']  # added timers aren't due until after the time they were added at
+    timers.update(1.0)
+    assert fired == ['first', 'later0', 'added']
+    assert len(timers) == 0
+
+
+def test_timers_on_a_clock():
+    clock = GameClock()
+    timers = Timers(clock)
+    fired = []
+    timers.add(1.0, lambda: fired.append(clock()))
+    clock.advance(0.5)
+    timers.update()
+    assert fired == []
+    clock.advance(1.0)
+    timers.update()
+    assert fired == [1.5]
+
+
+def test_matches_reference_model():
+    """Random adds, cancels, reschedules and updates, checked against a sorted list"""
+    rand = random.Random(7)
+    timers = Timers()
+    now = 0.0
+    fired = []
+    handles = []
+    model = {}  # handle index -> (trigger time, sequence number) of live timers
+    sequence = 0
+    for _ in range(2000):
+        op = rand.random()
+        if op < 0.4:
+            delay = rand.choice([0.0, 0.5, 1.0, rand.random() * 5])
+            idx = len(handles)
+            handles.append(timers.add(delay, lambda idx=idx: fired.append(idx)))
+            model[idx] = (now + delay, sequence)
+            sequence += 1
+        elif op < 0.55 and handles:
+            idx = rand.randrange(len(handles))
+            handles[idx].cancel()
+            model.pop(idx, None)
+        elif op < 0.7 and handles:
+            idx = rand.randrange(len(handles))
+            delay = rand.random() * 5
+            handles[idx].reschedule(delay)
+            model[idx] = (now + delay, sequence)
+            sequence += 1
+        else:
+            delta = rand.random()
+            now += delta
+            timers.update(delta)
+            due = sorted((when, seq, idx) for idx, (when, seq) in model.items() if when < now)
+            expected = [idx for _, _, idx in due]
+            for idx in expected:
+                del model[idx]
+            assert fired == expected
+            fired.clear()
+        assert len(timers) == len(model)
+        assert all(handle.active == (idx in model) for idx, handle in enumerate(handles))